@@ -5,12 +5,200 @@ DNS-over-HTTPS, split tunneling, and custom routing
 """
 
 import ipaddress
-from typing import Dict, List, Optional
+import socket
+from bisect import bisect_right
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Tuple, Union
+
+import jinja2
+
+
+# CIDR blocks for major streaming services
+_STREAMING_CIDRS = (
+    # Netflix
+    "45.57.0.0/17",
+    "64.120.128.0/17",
+    "66.197.128.0/17",
+    "108.175.32.0/20",
+    "185.2.220.0/22",
+    "185.9.188.0/22",
+    "192.173.64.0/18",
+    "198.38.96.0/19",
+    "198.45.48.0/20",
+    "208.75.76.0/22",
+    # YouTube
+    "172.217.0.0/16",
+    "172.253.0.0/16",
+    "142.250.0.0/15",
+    # Amazon Prime
+    "52.0.0.0/8",
+    "54.0.0.0/8",
+    # Disney+
+    "104.16.0.0/12",
+    "172.64.0.0/13",
+)
+
+# CIDR blocks for major gaming services
+_GAMING_CIDRS = (
+    # Steam
+    "103.10.124.0/23",
+    "103.28.54.0/23",
+    "146.66.152.0/21",
+    "155.133.224.0/19",
+    "162.254.192.0/21",
+    "185.25.180.0/22",
+    "192.69.96.0/22",
+    "205.185.194.0/24",
+    "205.196.6.0/24",
+    "208.64.200.0/22",
+    # Xbox Live
+    "40.0.0.0/8",
+    "52.0.0.0/8",
+    # PlayStation
+    "108.160.0.0/12",
+    "199.16.0.0/14",
+    # Epic Games
+    "3.0.0.0/8",
+    "18.0.0.0/8",
+)
+
+_IPV4_MAX = (1 << 32) - 1
+
+# DNS resolver config templates, compiled once at import
+_TEMPLATE_ENV = jinja2.Environment(
+    autoescape=False, keep_trailing_newline=True, undefined=jinja2.StrictUndefined
+)
+
+_RESOLVED_TEMPLATE = _TEMPLATE_ENV.from_string(
+    """[Resolve]
+DNS={{ dns.servers | join(' ') }}
+FallbackDNS=1.1.1.1 8.8.8.8
+Domains=~.
+DNSSEC=yes
+DNSOverTLS=yes
+DNSStubListener=no
+"""
+)
+
+_STUBBY_TEMPLATE = _TEMPLATE_ENV.from_string(
+    """resolution_type: GETDNS_RESOLUTION_STUB
+dns_transport_list:
+  - GETDNS_TRANSPORT_TLS
+tls_authentication: GETDNS_AUTHENTICATION_REQUIRED
+tls_query_padding_blocksize: 128
+edns_client_subnet_private: 1
+round_robin_upstreams: 1
+idle_timeout: 10000
+listen_addresses:
+  - 127.0.0.1@53
+  - 0::1@53
+upstream_recursive_servers:
+  - address_data: {{ dns.servers[0] }}
+    tls_auth_name: "{{ dns.dot_hostname }}"
+  - address_data: {{ dns.servers[1] }}
+    tls_auth_name: "{{ dns.dot_hostname }}"
+"""
+)
+
+
+def _freeze(value: Any) -> Any:
+    """Return a read-only view of nested dicts and lists"""
+    if isinstance(value, dict):
+        return MappingProxyType({key: _freeze(item) for key, item in value.items()})
+    if isinstance(value, list):
+        return tuple(_freeze(item) for item in value)
+    return value
+
+
+@lru_cache(maxsize=1024)
+def _parse_cidr(
+    cidr: str,
+) -> Union[ipaddress.IPv4Network, ipaddress.IPv6Network]:
+    """Parse a CIDR block, caching the result for repeated lookups"""
+    return ipaddress.ip_network(cidr, strict=False)
+
+
+@lru_cache(maxsize=4096)
+def _fast_cidr_valid(cidr: str) -> bool:
+    """Cheap yes/no CIDR check agreeing with strict ipaddress.ip_network"""
+    addr, sep, prefix = cidr.partition("/")
+    if not sep or (prefix.isascii() and prefix.isdigit()):
+        for family, bits in ((socket.AF_INET, 32), (socket.AF_INET6, 128)):
+            try:
+                packed = socket.inet_pton(family, addr)
+            except OSError:
+                continue
+            prefixlen = int(prefix) if sep else bits
+            if prefixlen > bits:
+                return False
+            # Host bits below the prefix make the block invalid, as in strict mode
+            return int.from_bytes(packed, "big") & ((1 << (bits - prefixlen)) - 1) == 0
+
+    # Netmask notation, scoped IPv6 addresses and anything else unusual
+    try:
+        ipaddress.ip_network(cidr)
+    except ValueError:
+        return False
+    return True
+
+
+def _build_ip_index(
+    networks: Iterable[Union[ipaddress.IPv4Network, ipaddress.IPv6Network]],
+) -> List[Tuple[int, int]]:
+    """Build a sorted, merged table of (first, last) IPv4 integer ranges
+
+    IPv6 networks are skipped so their integers cannot shadow IPv4 ones.
+    """
+    ranges = sorted(
+        (int(net.network_address), int(net.broadcast_address))
+        for net in networks
+        if net.version == 4
+    )
+
+    index: List[Tuple[int, int]] = []
+    for first, last in ranges:
+        if index and first <= index[-1][1] + 1:
+            if last > index[-1][1]:
+                index[-1] = (index[-1][0], last)
+        else:
+            index.append((first, last))
+    return index
+
+
+def ip_index_contains(
+    index: List[Tuple[int, int]], ip: Union[int, str, ipaddress.IPv4Address]
+) -> bool:
+    """Check whether an IPv4 address falls inside an index from _build_ip_index"""
+    ip_int = ip if isinstance(ip, int) else int(ipaddress.IPv4Address(ip))
+    i = bisect_right(index, (ip_int, _IPV4_MAX)) - 1
+    return i >= 0 and index[i][0] <= ip_int <= index[i][1]
+
+
+# (include, exclude) containment indices for the static streaming and gaming
+# presets, built once at import rather than per AdvancedConfig
+_FULL_TUNNEL_INDEX = _build_ip_index([_parse_cidr("0.0.0.0/0")])
+_STREAMING_INDICES = (
+    _FULL_TUNNEL_INDEX,
+    _build_ip_index(map(_parse_cidr, _STREAMING_CIDRS)),
+)
+_GAMING_INDICES = (
+    _FULL_TUNNEL_INDEX,
+    _build_ip_index(map(_parse_cidr, _GAMING_CIDRS)),
+)
 
 
 class AdvancedConfig:
     """Advanced WireGuard configuration features"""
 
+    _SECTION_HEADERS = {"[Interface]": "interface", "[Peer]": "peer"}
+
+    # Keys regenerated by generate_advanced_client_config
+    _REPLACED_KEYS = {
+        "interface": frozenset({"DNS", "MTU", "PostUp", "PostDown"}),
+        "peer": frozenset({"AllowedIPs", "PersistentKeepalive"}),
+    }
+
     def __init__(self):
         self.dns_providers = {
             "cloudflare": {
@@ -49,12 +237,12 @@ class AdvancedConfig:
             "streaming": {
                 "description": "Exclude streaming services from Proxy",
                 "include": ["0.0.0.0/0"],
-                "exclude": self._get_streaming_cidrs(),
+                "exclude": _STREAMING_CIDRS,
             },
             "gaming": {
                 "description": "Exclude gaming services from Proxy",
                 "include": ["0.0.0.0/0"],
-                "exclude": self._get_gaming_cidrs(),
+                "exclude": _GAMING_CIDRS,
             },
             "privacy": {
                 "description": "Route all traffic through Proxy except local",
@@ -68,56 +256,28 @@ class AdvancedConfig:
             },
         }
 
-    def _get_streaming_cidrs(self) -> List[str]:
-        """Get CIDR blocks for major streaming services"""
-        return [
-            # Netflix
-            "45.57.0.0/17",
-            "64.120.128.0/17",
-            "66.197.128.0/17",
-            "108.175.32.0/20",
-            "185.2.220.0/22",
-            "185.9.188.0/22",
-            "192.173.64.0/18",
-            "198.38.96.0/19",
-            "198.45.48.0/20",
-            "208.75.76.0/22",
-            # YouTube
-            "172.217.0.0/16",
-            "172.253.0.0/16",
-            "142.250.0.0/15",
-            # Amazon Prime
-            "52.0.0.0/8",
-            "54.0.0.0/8",
-            # Disney+
-            "104.16.0.0/12",
-            "172.64.0.0/13",
-        ]
-
-    def _get_gaming_cidrs(self) -> List[str]:
-        """Get CIDR blocks for major gaming services"""
-        return [
-            # Steam
-            "103.10.124.0/23",
-            "103.28.54.0/23",
-            "146.66.152.0/21",
-            "155.133.224.0/19",
-            "162.254.192.0/21",
-            "185.25.180.0/22",
-            "192.69.96.0/22",
-            "205.185.194.0/24",
-            "205.196.6.0/24",
-            "208.64.200.0/22",
-            # Xbox Live
-            "40.0.0.0/8",
-            "52.0.0.0/8",
-            # PlayStation
-            "108.160.0.0/12",
-            "199.16.0.0/14",
-            # Epic Games
-            "3.0.0.0/8",
-            "18.0.0.0/8",
-        ]
+        # Preset CIDRs are static, so parse (and thereby validate) them once
+        self._validated_presets = {
+            mode: (
+                tuple(_parse_cidr(cidr) for cidr in preset["include"]),
+                tuple(_parse_cidr(cidr) for cidr in preset["exclude"]),
+            )
+            for mode, preset in self.split_tunnel_presets.items()
+            if mode != "custom"
+        }
+
+        # Containment indices for the presets; streaming and gaming share the
+        # module-level ones, the short remaining lists are indexed here
+        self._preset_indices = {
+            "streaming": _STREAMING_INDICES,
+            "gaming": _GAMING_INDICES,
+        }
+        for mode, (include, exclude) in self._validated_presets.items():
+            if mode not in self._preset_indices:
+                self._preset_indices[mode] = (
+                    _build_ip_index(include),
+                    _build_ip_index(exclude),
+                )
 
     def configure_dns_over_https(self, provider: str = "cloudflare") -> Dict:
         """Configure DNS-over-HTTPS settings"""
@@ -127,33 +287,10 @@ class AdvancedConfig:
         dns_config = self.dns_providers[provider]
 
         # Generate systemd-resolved configuration
-        resolved_config = f"""[Resolve]
-DNS={' '.join(dns_config['servers'])}
-FallbackDNS=1.1.1.1 8.8.8.8
-Domains=~.
-DNSSEC=yes
-DNSOverTLS=yes
-DNSStubListener=no
-"""
+        resolved_config = _RESOLVED_TEMPLATE.render(dns=dns_config)
 
         # Generate stubby configuration for DNS-over-TLS
-        stubby_config = f"""resolution_type: GETDNS_RESOLUTION_STUB
-dns_transport_list:
-  - GETDNS_TRANSPORT_TLS
-tls_authentication: GETDNS_AUTHENTICATION_REQUIRED
-tls_query_padding_blocksize: 128
-edns_client_subnet_private: 1
-round_robin_upstreams: 1
-idle_timeout: 10000
-listen_addresses:
-  - 127.0.0.1@53
-  - 0::1@53
-upstream_recursive_servers:
-  - address_data: {dns_config['servers'][0]}
-    tls_auth_name: "{dns_config['dot_hostname']}"
-  - address_data: {dns_config['servers'][1]}
-    tls_auth_name: "{dns_config['dot_hostname']}"
-"""
+        stubby_config = _STUBBY_TEMPLATE.render(dns=dns_config)
 
         # Generate dnscrypt-proxy configuration
         dnscrypt_config = {
@@ -210,17 +347,22 @@ upstream_recursive_servers:
             config["include"] = custom_include or []
             config["exclude"] = custom_exclude or []
 
-        # Validate CIDR blocks
-        for cidr_list in [config["include"], config["exclude"]]:
-            for cidr in cidr_list:
-                try:
-                    ipaddress.ip_network(cidr)
-                except ValueError:
-                    raise ValueError(f"Invalid CIDR block: {cidr}")
+            # Validate user-supplied CIDR blocks; presets are checked in __init__
+            for cidr_list in [config["include"], config["exclude"]]:
+                for cidr in cidr_list:
+                    if not _fast_cidr_valid(cidr):
+                        raise ValueError(f"Invalid CIDR block: {cidr}")
 
-        # Generate routing rules
+        # Sorted IPv4 ranges for O(log n) lookups with ip_index_contains
+        if mode == "custom":
+            include_index = _build_ip_index(map(_parse_cidr, config["include"]))
+            exclude_index = _build_ip_index(map(_parse_cidr, config["exclude"]))
+        else:
+            include_index, exclude_index = self._preset_indices[mode]
+
+        # Generate routing rules, reusing earlier results for the same lists
         routing_rules = self._generate_routing_rules(
-            config["include"], config["exclude"]
+            tuple(config["include"]), tuple(config["exclude"])
         )
 
         return {
@@ -229,40 +371,45 @@ upstream_recursive_servers:
             "include": config["include"],
             "exclude": config["exclude"],
             "routing_rules": routing_rules,
+            "include_index": include_index,
+            "exclude_index": exclude_index,
         }
 
-    def _generate_routing_rules(self, include: List[str], exclude: List[str]) -> Dict:
-        """Generate platform-specific routing rules"""
-        # Linux routing rules
-        linux_rules = {"up": [], "down": []}
-
-        # Add routes for included networks
-        for cidr in include:
-            linux_rules["up"].append(f"ip route add {cidr} dev %i")
-            linux_rules["down"].append(f"ip route del {cidr} dev %i")
+    @staticmethod
+    @lru_cache(maxsize=256)
+    def _generate_routing_rules(
+        include: Tuple[str, ...], exclude: Tuple[str, ...]
+    ) -> Mapping:
+        """Generate platform-specific routing rules
 
-        # Add exceptions for excluded networks
-        for cidr in exclude:
-            linux_rules["up"].append(
+        Results are cached and shared, so they are returned read-only.
+        """
+        # Linux: routes for included networks, then exceptions for excluded
+        linux_rules = {
+            "up": [f"ip route add {cidr} dev %i" for cidr in include]
+            + [
                 f"ip route add {cidr} via $(ip route | grep default | awk '{{print $3}}')"
-            )
-            linux_rules["down"].append(f"ip route del {cidr}")
+                for cidr in exclude
+            ],
+            "down": [f"ip route del {cidr} dev %i" for cidr in include]
+            + [f"ip route del {cidr}" for cidr in exclude],
+        }
 
         # Windows routing rules
-        windows_rules = {"up": [], "down": []}
-
-        for cidr in include:
-            windows_rules["up"].append(f"route add {cidr} 0.0.0.0 IF %i")
-            windows_rules["down"].append(f"route delete {cidr}")
+        windows_rules = {
+            "up": [f"route add {cidr} 0.0.0.0 IF %i" for cidr in include],
+            "down": [f"route delete {cidr}" for cidr in include],
+        }
 
         # macOS routing rules
-        macos_rules = {"up": [], "down": []}
-
-        for cidr in include:
-            macos_rules["up"].append(f"route add {cidr} -interface utun0")
-            macos_rules["down"].append(f"route delete {cidr}")
+        macos_rules = {
+            "up": [f"route add {cidr} -interface utun0" for cidr in include],
+            "down": [f"route delete {cidr}" for cidr in include],
+        }
 
-        return {"linux": linux_rules, "windows": windows_rules, "macos": macos_rules}
+        return _freeze(
+            {"linux": linux_rules, "windows": windows_rules, "macos": macos_rules}
+        )
 
     def generate_advanced_client_config(
         self,
@@ -273,26 +420,21 @@ upstream_recursive_servers:
         persistent_keepalive: int = 25,
     ) -> str:
         """Generate client configuration with advanced features"""
-        lines = base_config.strip().split("\n")
         config_sections = {"interface": [], "peer": []}
         current_section = None
 
-        # Parse existing configuration
-        for line in lines:
-            if line.startswith("[Interface]"):
-                current_section = "interface"
-            elif line.startswith("[Peer]"):
-                current_section = "peer"
+        # Parse existing configuration, dropping keys we regenerate below
+        for line in base_config.strip().splitlines():
+            section = self._SECTION_HEADERS.get(line.strip())
+            if section:
+                current_section = section
             elif current_section and line.strip():
-                config_sections[current_section].append(line)
+                key = line.split("=", 1)[0].strip()
+                if key not in self._REPLACED_KEYS[current_section]:
+                    config_sections[current_section].append(line)
 
-        # Update interface section
-        interface_lines = ["[Interface]"]
-
-        # Add existing interface settings
-        for line in config_sections["interface"]:
-            if not line.startswith(("DNS", "MTU", "PostUp", "PostDown")):
-                interface_lines.append(line)
+        # Update interface section, keeping existing settings
+        interface_lines = ["[Interface]", *config_sections["interface"]]
 
         # Add DNS configuration
         if dns_config:
@@ -309,13 +451,8 @@ upstream_recursive_servers:
             if rules["down"]:
                 interface_lines.append(f"PostDown = {'; '.join(rules['down'])}")
 
-        # Update peer section
-        peer_lines = ["\n[Peer]"]
-
-        # Add existing peer settings
-        for line in config_sections["peer"]:
-            if not line.startswith(("AllowedIPs", "PersistentKeepalive")):
-                peer_lines.append(line)
+        # Update peer section, keeping existing settings
+        peer_lines = ["\n[Peer]", *config_sections["peer"]]
 
         # Add AllowedIPs based on split tunneling
         if split_tunnel:
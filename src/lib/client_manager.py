@@ -4,31 +4,128 @@ Advanced Client Management System for ProxyGen
 Handles client lifecycle, IP allocation, and access control
 """
 
+import base64
+import io
+import itertools
 import json
 import ipaddress
-import subprocess
 import os
 import sqlite3
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import datetime, timedelta
 from pathlib import Path
-from typing import Dict, List, Optional
-import qrcode
-from cryptography.hazmat.backends import default_backend
+from typing import Dict, Iterator, List, Optional, TextIO
+import jinja2
+
+try:
+    import orjson
+
+    def _dumps_record(obj) -> str:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2, default=str).decode()
+
+except ImportError:  # orjson is optional; fall back to the stdlib encoder
+
+    def _dumps_record(obj) -> str:
+        return json.dumps(obj, indent=2, default=str)
+
+
+# WireGuard config templates, compiled once at import
+_TEMPLATE_ENV = jinja2.Environment(
+    autoescape=False, keep_trailing_newline=True, undefined=jinja2.StrictUndefined
+)
+
+_CLIENT_CONFIG_TEMPLATE = _TEMPLATE_ENV.from_string(
+    """# ProxyGen Client Configuration
+# Name: {{ name }}
+# Generated: {{ generated }}
+
+[Interface]
+PrivateKey = {{ keys.private }}
+Address = {{ client_ip }}/32
+DNS = {{ dns }}
+
+[Peer]
+PublicKey = {{ server.public_key }}
+PresharedKey = {{ keys.preshared }}
+Endpoint = {{ server.public_ip }}:{{ server.wireguard_port }}
+AllowedIPs = 0.0.0.0/0, ::/0
+PersistentKeepalive = 25
+"""
+)
+
+_PEER_CONFIG_TEMPLATE = _TEMPLATE_ENV.from_string(
+    """
+# Client: {{ client_name }}
+[Peer]
+PublicKey = {{ client_public_key }}
+AllowedIPs = {{ client_ip }}/32
+"""
+)
 
 
 class ClientManager:
     """Advanced client management with database backing"""
 
+    # Largest host range searched with an in-memory bitmap (a /16)
+    BITMAP_MAX_HOSTS = 1 << 16
+
+    SERVER_CONFIG_SUFFIX = "-server.json"
+
+    # Pixels per QR module in generated images
+    QR_BOX_SIZE = 10
+
+    # Rows pulled per fetchmany() when streaming client listings
+    FETCH_BATCH_SIZE = 512
+
+    _INSERT_CLIENT_SQL = """
+        INSERT INTO clients (
+            name, email, public_key, private_key, preshared_key,
+            ip_address, server_region, device_type, data_limit_gb,
+            expires_at, notes
+        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    """
+
     def __init__(self, base_dir: Path):
         self.base_dir = base_dir
         self.db_path = base_dir / "state" / "clients.db"
         self.configs_dir = base_dir / "configs"
+
+        # *-server.json files by "<provider>-<region>", listed on first use
+        self._server_files: Optional[Dict[str, Path]] = None
+
+        # Parsed *-server.json files keyed by region, validated by mtime
+        self._server_paths: Dict[str, Path] = {}
+        self._server_mtimes: Dict[str, float] = {}
+        self._server_configs: Dict[str, Dict] = {}
+
+        # QR rendering runs off the critical path; flush() waits for it
+        self._io_pool = ThreadPoolExecutor(max_workers=4)
+        self._pending_io: List[Future] = []
+
+        # Single long-lived connection shared by every operation
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA temp_store=MEMORY")
+        self._conn.row_factory = sqlite3.Row
+
         self.init_database()
 
+    def flush(self):
+        """Wait for background QR code generation, re-raising any error"""
+        pending, self._pending_io = self._pending_io, []
+        for future in pending:
+            future.result()
+
+    def close(self):
+        """Finish background work and close the database connection"""
+        self.flush()
+        self._io_pool.shutdown(wait=True)
+        self._conn.close()
+
     def init_database(self):
         """Initialise client database"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        cursor = self._conn.cursor()
 
         # Create clients table
         cursor.execute(
@@ -76,6 +173,7 @@ class ClientManager:
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
                 subnet TEXT NOT NULL,
                 ip_address TEXT UNIQUE NOT NULL,
+                ip_int INTEGER,
                 client_id INTEGER,
                 allocated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                 FOREIGN KEY (client_id) REFERENCES clients (id)
@@ -83,58 +181,127 @@ class ClientManager:
         """
         )
 
-        conn.commit()
-        conn.close()
+        # Databases created before ip_int existed need the column backfilled
+        cursor.execute("PRAGMA table_info(ip_allocations)")
+        if "ip_int" not in {row[1] for row in cursor.fetchall()}:
+            cursor.execute("ALTER TABLE ip_allocations ADD COLUMN ip_int INTEGER")
+            cursor.execute("SELECT id, ip_address FROM ip_allocations")
+            cursor.executemany(
+                "UPDATE ip_allocations SET ip_int = ? WHERE id = ?",
+                [
+                    (int(ipaddress.IPv4Address(ip_address)), row_id)
+                    for row_id, ip_address in cursor.fetchall()
+                ],
+            )
+
+        # Indices for the hot lookup paths; clients.name is already covered
+        # by its UNIQUE constraint and ip_allocations.subnet by the
+        # (subnet, ip_int) index
+        cursor.executescript(
+            """
+            CREATE INDEX IF NOT EXISTS idx_alloc_subnet_ip_int
+                ON ip_allocations (subnet, ip_int);
+            CREATE INDEX IF NOT EXISTS idx_clients_enabled_expires
+                ON clients (enabled, expires_at);
+            CREATE INDEX IF NOT EXISTS idx_logs_client
+                ON connection_logs (client_id, connected_at DESC);
+        """
+        )
+
+        self._conn.commit()
 
     def allocate_ip(self, subnet: str, server_region: str) -> Optional[str]:
         """Allocate next available IP address from subnet"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-
-        network = ipaddress.ip_network(subnet)
+        ip_int = next(self._iter_free_ips(subnet), None)
+        if ip_int is None:
+            return None
+        return str(ipaddress.IPv4Address(ip_int))
+
+    def _iter_free_ips(self, subnet: str) -> Iterator[int]:
+        """Yield unallocated host addresses of subnet as ascending integers"""
+        cursor = self._conn.cursor()
+
+        network = ipaddress.IPv4Network(subnet)
+        lo = int(network.network_address)
+        hi = int(network.broadcast_address)
+        if network.num_addresses > 2:
+            # Network and broadcast addresses are not usable hosts
+            lo += 1
+            hi -= 1
+
+        size = hi - lo + 1
+        if size <= self.BITMAP_MAX_HOSTS:
+            cursor.execute(
+                """
+                SELECT ip_int FROM ip_allocations
+                WHERE subnet = ? AND ip_int BETWEEN ? AND ?
+            """,
+                (subnet, lo, hi),
+            )
 
-        # Get all allocated IPs for this subnet
+            # One byte per host; mark .0/.1 with C-level slice assignment
+            # and let bytearray.find scan for the free slots
+            bitmap = bytearray(size)
+            for low_byte in (0, 1):
+                start = (low_byte - lo) % 256
+                bitmap[start::256] = b"\x01" * len(range(start, size, 256))
+            for (allocated,) in cursor:
+                bitmap[allocated - lo] = 1
+
+            index = bitmap.find(0)
+            while index >= 0:
+                yield lo + index
+                index = bitmap.find(0, index + 1)
+            return
+
+        # Allocated IPs in host range, in ascending order
         cursor.execute(
-            "SELECT ip_address FROM ip_allocations WHERE subnet = ?", (subnet,)
+            """
+            SELECT ip_int FROM ip_allocations
+            WHERE subnet = ? AND ip_int BETWEEN ? AND ?
+            ORDER BY ip_int
+        """,
+            (subnet, lo, hi),
         )
-        allocated_ips = {row[0] for row in cursor.fetchall()}
-
-        # Find first available IP (skip .0 and .1)
-        for ip in network.hosts():
-            ip_str = str(ip)
-            if ip_str.endswith(".0") or ip_str.endswith(".1"):
-                continue
-            if ip_str not in allocated_ips:
-                conn.close()
-                return ip_str
-
-        conn.close()
-        return None
+        allocated_ips = [row[0] for row in cursor.fetchall()]
+
+        # Walk the sorted allocations yielding the gaps (skip .0 and .1)
+        candidate = lo
+        for allocated in allocated_ips + [hi + 1]:
+            while candidate < allocated:
+                if candidate & 0xFF not in (0, 1):
+                    yield candidate
+                candidate += 1
+            candidate = max(candidate, allocated + 1)
 
     def generate_keys(self) -> Dict[str, str]:
         """Generate WireGuard key pair and preshared key"""
-        # Generate private key
-        private_key_cmd = subprocess.run(
-            ["wg", "genkey"], capture_output=True, text=True
+        from cryptography.hazmat.primitives import serialization
+        from cryptography.hazmat.primitives.asymmetric.x25519 import (
+            X25519PrivateKey,
         )
-        private_key = private_key_cmd.stdout.strip()
 
-        # Generate public key
-        public_key_cmd = subprocess.run(
-            ["wg", "pubkey"], input=private_key, capture_output=True, text=True
+        # Generate private key
+        private_key_obj = X25519PrivateKey.generate()
+        private_key_bytes = private_key_obj.private_bytes(
+            encoding=serialization.Encoding.Raw,
+            format=serialization.PrivateFormat.Raw,
+            encryption_algorithm=serialization.NoEncryption(),
         )
-        public_key = public_key_cmd.stdout.strip()
 
-        # Generate preshared key
-        preshared_key_cmd = subprocess.run(
-            ["wg", "genpsk"], capture_output=True, text=True
+        # Derive public key
+        public_key_bytes = private_key_obj.public_key().public_bytes(
+            encoding=serialization.Encoding.Raw,
+            format=serialization.PublicFormat.Raw,
         )
-        preshared_key = preshared_key_cmd.stdout.strip()
+
+        # Generate preshared key (32 random bytes, as `wg genpsk` does)
+        preshared_key_bytes = os.urandom(32)
 
         return {
-            "private": private_key,
-            "public": public_key,
-            "preshared": preshared_key,
+            "private": base64.b64encode(private_key_bytes).decode("ascii"),
+            "public": base64.b64encode(public_key_bytes).decode("ascii"),
+            "preshared": base64.b64encode(preshared_key_bytes).decode("ascii"),
         }
 
     def add_client(
@@ -147,74 +314,171 @@ class ClientManager:
         expires_days: Optional[int] = None,
         notes: Optional[str] = None,
     ) -> Dict:
-        """Add a new client with advanced options"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        """Add a new client with advanced options
+
+        The client's QR code is written before this returns, so a rendering
+        error is raised here.
+        """
+        cursor = self._conn.cursor()
 
         # Check if client already exists
         cursor.execute("SELECT id FROM clients WHERE name = ?", (name,))
         if cursor.fetchone():
-            conn.close()
             raise ValueError(f"Client {name} already exists")
 
         # Load server configuration
         server_config = self.load_server_config(server_region)
         if not server_config:
-            conn.close()
             raise ValueError(f"Server configuration not found for {server_region}")
 
         # Generate keys
         keys = self.generate_keys()
 
-        # Allocate IP address
-        client_ip = self.allocate_ip(server_config["subnet"], server_region)
-        if not client_ip:
-            conn.close()
+        # Allocate IP address, formatting only the chosen integer
+        ip_int = next(self._iter_free_ips(server_config["subnet"]), None)
+        if ip_int is None:
             raise ValueError("No available IP addresses in subnet")
+        client_ip = str(ipaddress.IPv4Address(ip_int))
 
         # Calculate expiry date if specified
         expires_at = None
         if expires_days:
             expires_at = datetime.now() + timedelta(days=expires_days)
 
-        # Insert client record
-        cursor.execute(
-            """
-            INSERT INTO clients (
-                name, email, public_key, private_key, preshared_key,
-                ip_address, server_region, device_type, data_limit_gb,
-                expires_at, notes
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """,
-            (
-                name,
-                email,
-                keys["public"],
-                keys["private"],
-                keys["preshared"],
-                client_ip,
-                server_region,
-                device_type,
-                data_limit_gb,
-                expires_at,
-                notes,
-            ),
-        )
+        with self._conn:
+            # Insert client record
+            cursor.execute(
+                self._INSERT_CLIENT_SQL,
+                (
+                    name,
+                    email,
+                    keys["public"],
+                    keys["private"],
+                    keys["preshared"],
+                    client_ip,
+                    server_region,
+                    device_type,
+                    data_limit_gb,
+                    expires_at,
+                    notes,
+                ),
+            )
 
-        client_id = cursor.lastrowid
+            client_id = cursor.lastrowid
+
+            # Record IP allocation
+            cursor.execute(
+                """
+                INSERT INTO ip_allocations (subnet, ip_address, ip_int, client_id)
+                VALUES (?, ?, ?, ?)
+            """,
+                (
+                    server_config["subnet"],
+                    client_ip,
+                    ip_int,
+                    client_id,
+                ),
+            )
 
-        # Record IP allocation
-        cursor.execute(
-            """
-            INSERT INTO ip_allocations (subnet, ip_address, client_id)
-            VALUES (?, ?, ?)
-        """,
-            (server_config["subnet"], client_ip, client_id),
+        return self._write_client_files(
+            name, server_region, keys, client_ip, server_config, expires_at,
+            wait_for_qr=True,
         )
 
-        conn.commit()
-        conn.close()
+    def add_clients_bulk(self, specs: List[Dict]) -> List[Dict]:
+        """Add many clients in a single transaction
+
+        Each spec takes the same keys as add_client's arguments. QR codes
+        are rendered in the background: the returned qr_code paths may not
+        exist yet, and rendering errors are only raised by flush() or
+        close(), which must be called before relying on them.
+        """
+        cursor = self._conn.cursor()
+
+        names = [spec["name"] for spec in specs]
+        if len(set(names)) != len(names):
+            raise ValueError("Duplicate client names in bulk request")
+        for name in names:
+            cursor.execute("SELECT id FROM clients WHERE name = ?", (name,))
+            if cursor.fetchone():
+                raise ValueError(f"Client {name} already exists")
+
+        # Resolve everything up front so the transaction only does inserts
+        free_ips: Dict[str, Iterator[int]] = {}
+        client_rows = []
+        allocation_rows = []
+        pending = []
+        for spec in specs:
+            name = spec["name"]
+            server_region = spec["server_region"]
+
+            server_config = self.load_server_config(server_region)
+            if not server_config:
+                raise ValueError(
+                    f"Server configuration not found for {server_region}"
+                )
+
+            subnet = server_config["subnet"]
+            if subnet not in free_ips:
+                free_ips[subnet] = self._iter_free_ips(subnet)
+            ip_int = next(free_ips[subnet], None)
+            if ip_int is None:
+                raise ValueError("No available IP addresses in subnet")
+            client_ip = str(ipaddress.IPv4Address(ip_int))
+
+            keys = self.generate_keys()
+
+            expires_at = None
+            if spec.get("expires_days"):
+                expires_at = datetime.now() + timedelta(days=spec["expires_days"])
+
+            client_rows.append(
+                (
+                    name,
+                    spec.get("email"),
+                    keys["public"],
+                    keys["private"],
+                    keys["preshared"],
+                    client_ip,
+                    server_region,
+                    spec.get("device_type"),
+                    spec.get("data_limit_gb"),
+                    expires_at,
+                    spec.get("notes"),
+                )
+            )
+            allocation_rows.append((subnet, client_ip, ip_int, name))
+            pending.append(
+                (name, server_region, keys, client_ip, server_config, expires_at)
+            )
+
+        with self._conn:
+            cursor.executemany(self._INSERT_CLIENT_SQL, client_rows)
+            cursor.executemany(
+                """
+                INSERT INTO ip_allocations (subnet, ip_address, ip_int, client_id)
+                VALUES (?, ?, ?, (SELECT id FROM clients WHERE name = ?))
+            """,
+                allocation_rows,
+            )
+
+        return [self._write_client_files(*args) for args in pending]
 
+    def _write_client_files(
+        self,
+        name: str,
+        server_region: str,
+        keys: Dict,
+        client_ip: str,
+        server_config: Dict,
+        expires_at: Optional[datetime],
+        wait_for_qr: bool = False,
+    ) -> Dict:
+        """Write config, QR code and server peer files for a stored client
+
+        The QR code is rendered in the background. With wait_for_qr it is
+        finished before returning; otherwise flush() waits for it.
+        """
         # Generate configuration file
         config_content = self.generate_client_config(
             name, keys, client_ip, server_config
@@ -225,12 +489,19 @@ class ClientManager:
         with open(config_file, "w") as f:
             f.write(config_content)
 
-        # Generate QR code
-        self.generate_qr_code(config_file)
+        # Generate QR code in the background
+        qr_future = self._io_pool.submit(
+            self.generate_qr_code, config_file, config_text=config_content
+        )
 
         # Update server configuration
         self.update_server_config(server_region, name, keys["public"], client_ip)
 
+        if wait_for_qr:
+            qr_future.result()
+        else:
+            self._pending_io.append(qr_future)
+
         return {
             "name": name,
             "ip_address": client_ip,
@@ -243,32 +514,72 @@ class ClientManager:
         self, name: str, keys: Dict, client_ip: str, server_config: Dict
     ) -> str:
         """Generate WireGuard client configuration"""
-        config = f"""# ProxyGen Client Configuration
-# Name: {name}
-# Generated: {datetime.now().isoformat()}
-
-[Interface]
-PrivateKey = {keys['private']}
-Address = {client_ip}/32
-DNS = {', '.join(server_config.get('dns', ['1.1.1.1', '1.0.0.1']))}
-
-[Peer]
-PublicKey = {server_config['public_key']}
-PresharedKey = {keys['preshared']}
-Endpoint = {server_config['public_ip']}:{server_config['wireguard_port']}
-AllowedIPs = 0.0.0.0/0, ::/0
-PersistentKeepalive = 25
-"""
-        return config
+        return _CLIENT_CONFIG_TEMPLATE.render(
+            name=name,
+            generated=datetime.now().isoformat(),
+            keys=keys,
+            client_ip=client_ip,
+            dns=", ".join(server_config.get("dns", ["1.1.1.1", "1.0.0.1"])),
+            server=server_config,
+        )
 
     def load_server_config(self, server_region: str) -> Optional[Dict]:
         """Load server configuration from file"""
-        for config_file in self.configs_dir.glob("*-server.json"):
-            if server_region in config_file.name:
-                with open(config_file, "r") as f:
-                    return json.load(f)
+        cached_path = self._server_paths.get(server_region)
+        if cached_path is not None:
+            try:
+                mtime = cached_path.stat().st_mtime
+            except FileNotFoundError:
+                mtime = None
+            if mtime == self._server_mtimes[server_region]:
+                return self._server_configs[server_region]
+            self.reload_server_configs()
+
+        config_file = self._find_server_config_file(server_region)
+        if config_file is None:
+            return None
+
+        mtime = config_file.stat().st_mtime
+        with open(config_file, "r") as f:
+            config = json.load(f)
+        self._server_paths[server_region] = config_file
+        self._server_mtimes[server_region] = mtime
+        self._server_configs[server_region] = config
+        return config
+
+    def _find_server_config_file(self, server_region: str) -> Optional[Path]:
+        """Locate the *-server.json file for a region by name alone"""
+        for rescan in (False, True):
+            if rescan or self._server_files is None:
+                self._server_files = {}
+                if self.configs_dir.is_dir():
+                    for path in self.configs_dir.iterdir():
+                        if path.name.endswith(self.SERVER_CONFIG_SUFFIX):
+                            key = path.name[: -len(self.SERVER_CONFIG_SUFFIX)]
+                            self._server_files[key] = path
+
+            # Exact "<provider>-<region>" hit first, else any name containing it
+            config_file = self._server_files.get(server_region)
+            if config_file is None:
+                config_file = next(
+                    (
+                        path
+                        for path in self._server_files.values()
+                        if server_region in path.name
+                    ),
+                    None,
+                )
+            if config_file is not None:
+                return config_file
         return None
 
+    def reload_server_configs(self):
+        """Drop cached server configurations so they are re-read from disk"""
+        self._server_files = None
+        self._server_paths.clear()
+        self._server_mtimes.clear()
+        self._server_configs.clear()
+
     def update_server_config(
         self,
         server_region: str,
@@ -279,52 +590,80 @@ PersistentKeepalive = 25
         """Update server's WireGuard configuration with new client"""
         # This would typically use Ansible to update the server
         # For now, we'll create a peer configuration file
-        peer_config = f"""
-# Client: {client_name}
-[Peer]
-PublicKey = {client_public_key}
-AllowedIPs = {client_ip}/32
-"""
+        peer_config = _PEER_CONFIG_TEMPLATE.render(
+            client_name=client_name,
+            client_public_key=client_public_key,
+            client_ip=client_ip,
+        )
 
         peer_file = self.configs_dir / f"peer-{server_region}-{client_name}.conf"
         with open(peer_file, "w") as f:
             f.write(peer_config)
 
-    def generate_qr_code(self, config_file: Path):
-        """Generate QR code for configuration file"""
-        with open(config_file, "r") as f:
-            config_text = f.read()
+    def generate_qr_code(
+        self,
+        config_file: Path,
+        config_text: Optional[str] = None,
+        fmt: str = "png",
+    ) -> Path:
+        """Generate QR code for configuration file
+
+        Pass config_text when the contents are already in memory to skip
+        reading the file back from disk. fmt selects a raster "png" or a
+        vector "svg" image.
+        """
+        if fmt not in ("png", "svg"):
+            raise ValueError(f"Unsupported QR code format: {fmt}")
+
+        import qrcode
+
+        if config_text is None:
+            with open(config_file, "r") as f:
+                config_text = f.read()
 
+        # Encode at one pixel per module and scale afterwards; drawing
+        # straight at box_size=10 is far slower for the same output
         qr = qrcode.QRCode(
             version=1,
             error_correction=qrcode.constants.ERROR_CORRECT_L,
-            box_size=10,
+            box_size=1 if fmt == "png" else self.QR_BOX_SIZE,
             border=4,
         )
         qr.add_data(config_text)
         qr.make(fit=True)
 
-        img = qr.make_image(fill_colour="black", back_colour="white")
-        qr_file = config_file.with_suffix(".png")
-        img.save(qr_file)
+        qr_file = config_file.with_suffix(f".{fmt}")
+        if fmt == "svg":
+            from qrcode.image.svg import SvgPathImage
+
+            img = qr.make_image(image_factory=SvgPathImage)
+            img.save(qr_file)
+        else:
+            from PIL import Image
+
+            img = qr.make_image(fill_colour="black", back_colour="white")
+            width, height = img.size
+            img.resize(
+                (width * self.QR_BOX_SIZE, height * self.QR_BOX_SIZE),
+                Image.NEAREST,
+            ).save(qr_file)
+
+        return qr_file
 
     def revoke_client(self, name: str) -> bool:
         """Revoke client access"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-
-        cursor.execute("UPDATE clients SET enabled = 0 WHERE name = ?", (name,))
+        with self._conn:
+            cursor = self._conn.execute(
+                "UPDATE clients SET enabled = 0 WHERE name = ?", (name,)
+            )
 
         affected = cursor.rowcount
-        conn.commit()
-        conn.close()
 
         return affected > 0
 
-    def list_clients(self, active_only: bool = False) -> List[Dict]:
+    def list_clients(self, active_only: bool = False) -> Iterator[Dict]:
         """List all clients with their status"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        cursor = self._conn.cursor()
 
         query = """
             SELECT name, email, ip_address, server_region, created_at,
@@ -338,31 +677,19 @@ AllowedIPs = {client_ip}/32
 
         cursor.execute(query)
 
-        clients = []
-        for row in cursor.fetchall():
-            clients.append(
-                {
-                    "name": row[0],
-                    "email": row[1],
-                    "ip_address": row[2],
-                    "server_region": row[3],
-                    "created_at": row[4],
-                    "last_seen": row[5],
-                    "enabled": bool(row[6]),
-                    "data_limit_gb": row[7],
-                    "data_used_gb": row[8],
-                    "expires_at": row[9],
-                    "device_type": row[10],
-                }
-            )
-
-        conn.close()
-        return clients
+        # Stream rows in batches rather than materialising the whole table
+        while True:
+            batch = cursor.fetchmany(self.FETCH_BATCH_SIZE)
+            if not batch:
+                break
+            for row in batch:
+                client = dict(row)
+                client["enabled"] = bool(client["enabled"])
+                yield client
 
     def get_client_stats(self, name: str) -> Dict:
         """Get detailed statistics for a client"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        cursor = self._conn.cursor()
 
         # Get client details
         cursor.execute(
@@ -374,7 +701,6 @@ AllowedIPs = {client_ip}/32
 
         client = cursor.fetchone()
         if not client:
-            conn.close()
             return {}
 
         # Get connection history
@@ -386,26 +712,24 @@ AllowedIPs = {client_ip}/32
             ORDER BY connected_at DESC
             LIMIT 10
         """,
-            (client[0],),
+            (client["id"],),
         )
 
         connections = cursor.fetchall()
 
-        conn.close()
-
         return {
             "client": {
-                "name": client[1],
-                "ip_address": client[5],
-                "created_at": client[7],
-                "last_seen": client[8],
-                "data_used_gb": client[10],
+                "name": client["name"],
+                "ip_address": client["ip_address"],
+                "created_at": client["created_at"],
+                "last_seen": client["last_seen"],
+                "data_used_gb": client["data_used_gb"],
             },
             "connections": [
                 {
-                    "connected_at": conn[0],
-                    "disconnected_at": conn[1],
-                    "data_transferred_mb": conn[2],
+                    "connected_at": conn["connected_at"],
+                    "disconnected_at": conn["disconnected_at"],
+                    "data_transferred_mb": conn["data_transferred_mb"],
                 }
                 for conn in connections
             ],
@@ -413,39 +737,58 @@ AllowedIPs = {client_ip}/32
 
     def cleanup_expired_clients(self):
         """Remove expired client configurations"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-
-        cursor.execute(
+        with self._conn:
+            cursor = self._conn.execute(
+                """
+                UPDATE clients
+                SET enabled = 0
+                WHERE expires_at IS NOT NULL
+                AND expires_at < datetime('now')
             """
-            UPDATE clients
-            SET enabled = 0
-            WHERE expires_at IS NOT NULL
-            AND expires_at < datetime('now')
-        """
-        )
+            )
 
         affected = cursor.rowcount
-        conn.commit()
-        conn.close()
 
         return affected
 
-    def export_clients(self, format: str = "json") -> str:
-        """Export client configurations"""
+    def export_clients(
+        self, format: str = "json", output: Optional[TextIO] = None
+    ) -> str:
+        """Export client configurations
+
+        When output is given the export is streamed to it and an empty
+        string is returned; otherwise the export is returned as a string.
+        """
+        if format not in ("json", "csv"):
+            raise ValueError(f"Unsupported format: {format}")
+
+        if output is None:
+            buffer = io.StringIO()
+            self.export_clients(format, buffer)
+            return buffer.getvalue()
+
         clients = self.list_clients()
 
         if format == "json":
-            return json.dumps(clients, indent=2, default=str)
-        elif format == "csv":
+            # Same layout as json.dumps(list, indent=2), one record at a time
+            first = next(clients, None)
+            if first is None:
+                output.write("[]")
+                return ""
+            output.write("[\n")
+            for index, client in enumerate(itertools.chain([first], clients)):
+                if index:
+                    output.write(",\n")
+                record = _dumps_record(client)
+                output.write("  " + record.replace("\n", "\n  "))
+            output.write("\n]")
+        else:
             import csv
-            import io
 
-            output = io.StringIO()
-            if clients:
-                writer = csv.DictWriter(output, fieldnames=clients[0].keys())
+            first = next(clients, None)
+            if first is not None:
+                writer = csv.DictWriter(output, fieldnames=first.keys())
                 writer.writeheader()
+                writer.writerow(first)
                 writer.writerows(clients)
-            return output.getvalue()
-        else:
-            raise ValueError(f"Unsupported format: {format}")
+        return ""
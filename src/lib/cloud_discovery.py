@@ -4,12 +4,30 @@ Cloud Resource Discovery for ProxyGen
 Discovers existing Proxy deployments using cloud provider CLIs
 """
 
+import asyncio
+import hashlib
 import json
+import os
+import re
+import shutil
 import subprocess
 import logging
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Dict, List, Optional, Any
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 from datetime import datetime
+from urllib.parse import urlencode
+
+try:
+    import orjson
+
+    _loads = orjson.loads
+except ImportError:  # orjson is optional; fall back to the stdlib decoder
+    _loads = json.loads
 
 logger = logging.getLogger(__name__)
 
@@ -17,9 +35,88 @@ logger = logging.getLogger(__name__)
 class CloudDiscovery:
     """Discover existing Proxy deployments using cloud provider CLIs"""
 
-    def __init__(self, base_dir: Path):
+    # Concurrent CLI calls when fanning out over AWS regions / Azure groups.
+    # Past a handful of in-flight calls AWS starts throttling, and the CLI's
+    # own backoff then makes discovery slower than a smaller pool would be
+    PROVIDER_CONCURRENCY = {
+        "aws": 5,
+        "azure": 8,
+    }
+
+    # Retries for CLI calls rejected by provider rate limiting, with the
+    # delay doubling from THROTTLE_BACKOFF seconds on each attempt
+    THROTTLE_RETRIES = 4
+    THROTTLE_BACKOFF = 1.0
+    THROTTLE_MARKERS = (b"ThrottlingException", b"RequestLimitExceeded", b"TooManyRequests")
+
+    # Literal prefix shared by every ProxyGen resource name; checked before
+    # the full naming pattern as a cheap reject
+    NAME_PREFIX = "proxygen-"
+
+    # Resource Graph query returning ProxyGen VMs shaped like the
+    # `az vm list --show-details` projection used per resource group
+    AZURE_GRAPH_QUERY = (
+        "Resources"
+        " | where type =~ 'microsoft.compute/virtualmachines'"
+        " | where name startswith 'proxygen-'"
+        " | where resourceGroup startswith 'proxygen-' and resourceGroup endswith '-rg'"
+        " | extend nicId = tolower(tostring(properties.networkProfile.networkInterfaces[0].id))"
+        " | join kind=leftouter (Resources"
+        " | where type =~ 'microsoft.network/networkinterfaces'"
+        " | project nicId = tolower(id),"
+        " pipId = tolower(tostring(properties.ipConfigurations[0].properties.publicIPAddress.id)))"
+        " on nicId"
+        " | join kind=leftouter (Resources"
+        " | where type =~ 'microsoft.network/publicipaddresses'"
+        " | project pipId = tolower(id), publicIps = tostring(properties.ipAddress))"
+        " on pipId"
+        " | project name, location, resourceGroup, id, tags, publicIps,"
+        " vmSize = tostring(properties.hardwareProfile.vmSize)"
+    )
+
+    # Field identifying a resource in inventory records, per provider
+    IDENTIFIER_FIELDS = {
+        "aws": "instance_id",
+        "azure": "vm_name",
+        "digitalocean": "instance_name",
+        "hetzner": "instance_name",
+    }
+
+    # Seconds a cached CLI response stays valid
+    DEFAULT_CACHE_TTL = 300
+
+    # CLI used to query each provider, and the environment variable holding
+    # an API token that lets discovery skip the CLI entirely
+    PROVIDER_CLIS = {
+        "aws": "aws",
+        "azure": "az",
+        "digitalocean": "doctl",
+        "hetzner": "hcloud",
+    }
+    PROVIDER_TOKEN_ENV = {
+        "digitalocean": "DIGITALOCEAN_ACCESS_TOKEN",
+        "hetzner": "HCLOUD_TOKEN",
+    }
+
+    # REST endpoints queried directly when an API token is present in the
+    # environment, skipping the doctl / hcloud process start
+    DIGITALOCEAN_API = "https://api.digitalocean.com/v2"
+    HETZNER_API = "https://api.hetzner.cloud/v1"
+    API_TIMEOUT = 30
+
+    def __init__(self, base_dir: Path, cache_ttl: int = DEFAULT_CACHE_TTL):
         self.base_dir = base_dir
         self.state_dir = base_dir / "state"
+
+        # Raw CLI output is cached on disk for cache_ttl seconds (0 disables)
+        self.cache_dir = Path(
+            os.environ.get(
+                "PROXYGEN_DISCOVERY_CACHE_DIR",
+                Path.home() / ".cache" / "proxygen" / "discovery",
+            )
+        )
+        self.cache_ttl = cache_ttl
+        self._no_cache = False
         
         # ProxyGen naming patterns for each provider
         # Format: proxygen-{region}-{uid}-{suffix}
@@ -30,99 +127,92 @@ class CloudDiscovery:
             "hetzner": r"^proxygen-[\w-]+-[a-f0-9]{6}$"       # proxygen-fsn1-abc123
         }
         
+        self._compiled_patterns = {
+            provider: re.compile(pattern)
+            for provider, pattern in self.naming_patterns.items()
+        }
+        
         # Project name (could be made configurable)
         self.project_name = "proxygen"
 
+        # Providers that can be queried here, so discovery never spawns a
+        # CLI that is not installed
+        self._available_providers = {
+            provider: bool(
+                shutil.which(cli)
+                or os.environ.get(self.PROVIDER_TOKEN_ENV.get(provider, ""))
+            )
+            for provider, cli in self.PROVIDER_CLIS.items()
+        }
+
+    def _provider_available(self, provider: str, quiet: bool = False) -> bool:
+        """Whether a provider can be queried, logging why when it cannot
+
+        quiet logs at info level, for sweeps across every provider where
+        most users only have some CLIs installed.
+        """
+        if self._available_providers[provider]:
+            return True
+
+        reason = f"'{self.PROVIDER_CLIS[provider]}' CLI not found"
+        token_env = self.PROVIDER_TOKEN_ENV.get(provider)
+        if token_env:
+            reason += f" and {token_env} not set"
+        log = logger.info if quiet else logger.warning
+        log(f"Skipping {provider} discovery: {reason}")
+        return False
+
     def discover_all_deployments(self) -> Dict[str, List[Dict]]:
         """Discover deployments across all cloud providers"""
         discoveries = {}
-        
-        # Try each provider
-        aws_deployments = self.discover_aws_deployments()
-        if aws_deployments:
-            discoveries["aws"] = aws_deployments
-            
-        azure_deployments = self.discover_azure_deployments()
-        if azure_deployments:
-            discoveries["azure"] = azure_deployments
-            
-        digitalocean_deployments = self.discover_digitalocean_deployments()
-        if digitalocean_deployments:
-            discoveries["digitalocean"] = digitalocean_deployments
-            
-        hetzner_deployments = self.discover_hetzner_deployments()
-        if hetzner_deployments:
-            discoveries["hetzner"] = hetzner_deployments
-            
+
+        discover_methods = {
+            "aws": self.discover_aws_deployments,
+            "azure": self.discover_azure_deployments,
+            "digitalocean": self.discover_digitalocean_deployments,
+            "hetzner": self.discover_hetzner_deployments,
+        }
+
+        # Each provider CLI is independent and network-bound, so query them
+        # all at once; keep results in provider order for stable output
+        with ThreadPoolExecutor(max_workers=len(discover_methods)) as executor:
+            futures = {
+                provider: executor.submit(method)
+                for provider, method in discover_methods.items()
+                if self._provider_available(provider, quiet=True)
+            }
+            for provider, future in futures.items():
+                provider_deployments = future.result()
+                if provider_deployments:
+                    discoveries[provider] = provider_deployments
+
         return discoveries
 
     def discover_aws_deployments(self) -> List[Dict]:
         """Discover AWS Proxy deployments using AWS CLI"""
-        import re
+        if not self._provider_available("aws"):
+            return []
+
         deployments = []
         
         try:
-            # Get all regions
-            regions_cmd = ["aws", "ec2", "describe-regions", "--query", "Regions[].RegionName", "--output", "json"]
-            result = subprocess.run(regions_cmd, capture_output=True, text=True, check=True)
-            regions = json.loads(result.stdout)
-            
-            for region in regions:
-                logger.info(f"Searching AWS region: {region}")
-                
-                # Search for instances with ProxyGen naming pattern in Name tag
-                # Using wildcard to catch proxygen-* instances
-                cmd = [
-                    "aws", "ec2", "describe-instances",
-                    "--region", region,
-                    "--filters",
-                    f"Name=tag:Name,Values=proxygen-{region}-*-proxy",
-                    "Name=instance-state-name,Values=running",
-                    "--query", "Reservations[].Instances[].[InstanceId,PublicIpAddress,InstanceType,Tags,LaunchTime,State.Name]",
-                    "--output", "json"
-                ]
-                
-                result = subprocess.run(cmd, capture_output=True, text=True, check=True)
-                instances = json.loads(result.stdout)
-                
-                for instance in instances:
-                    if not instance:
-                        continue
-                        
-                    instance_id, public_ip, instance_type, tags, launch_time, state = instance
-                    
-                    # Extract tags into dict
-                    tag_dict = {tag["Key"]: tag["Value"] for tag in (tags or [])}
-                    
-                    # Get the Name tag and validate it matches our pattern
-                    name_tag = tag_dict.get("Name", "")
-                    pattern = re.compile(self.naming_patterns["aws"])
-                    
-                    if not pattern.match(name_tag):
-                        logger.debug(f"Skipping instance {instance_id} - name '{name_tag}' doesn't match pattern")
-                        continue
-                    
-                    # Extract deployment UID from name (proxygen-region-UID-proxy)
-                    name_parts = name_tag.split("-")
-                    deployment_uid = name_parts[-2] if len(name_parts) >= 4 else tag_dict.get("DeploymentUID", "")
-                    
-                    deployment = {
-                        "provider": "aws",
-                        "region": region,
-                        "instance_id": instance_id,
-                        "instance_name": name_tag,
-                        "public_ip": public_ip,
-                        "instance_type": instance_type,
-                        "deployment_uid": deployment_uid,
-                        "created_at": launch_time,
-                        "state": state,
-                        "tags": tag_dict,
-                        "discovered_at": datetime.now().isoformat()
-                    }
-                    
-                    deployments.append(deployment)
-                    # Use green color for found deployments
-                    logger.info(f"\033[92mFound AWS deployment in {region}: {name_tag} ({public_ip})\033[0m")
+            # Get the regions enabled for this account; opt-in regions the
+            # account has not joined can hold no instances
+            regions_cmd = [
+                "aws", "ec2", "describe-regions",
+                "--filters", "Name=opt-in-status,Values=opt-in-not-required,opted-in",
+                "--query", "Regions[].RegionName",
+                "--output", "json"
+            ]
+            regions = _loads(self._run(regions_cmd))
+
+            # Search all regions concurrently from one event loop. EC2 and the
+            # Resource Groups Tagging API are both regional endpoints, so there
+            # is no single account-wide query to replace this fan-out; the
+            # Name tag filter on each call is already applied server-side.
+            discovered_at = datetime.now().isoformat()
+            for region_deployments in asyncio.run(self._adiscover_aws_regions(regions, discovered_at)):
+                deployments.extend(region_deployments)
                     
         except subprocess.CalledProcessError as e:
             logger.warning(f"AWS CLI error: {e}")
@@ -131,58 +221,107 @@ class CloudDiscovery:
             
         return deployments
 
+    async def _adiscover_aws_regions(self, regions: List[str], discovered_at: str) -> List[List[Dict]]:
+        """Discover AWS deployments in every region concurrently"""
+        # Bounded to stay clear of API throttling
+        semaphore = asyncio.Semaphore(self.PROVIDER_CONCURRENCY["aws"])
+        return await asyncio.gather(
+            *(self._adiscover_aws_region(region, semaphore, discovered_at) for region in regions)
+        )
+
+    async def _adiscover_aws_region(
+        self, region: str, semaphore: asyncio.Semaphore, discovered_at: str
+    ) -> List[Dict]:
+        """Discover AWS Proxy deployments in a single region"""
+        deployments = []
+
+        logger.info(f"Searching AWS region: {region}")
+        
+        # Search for instances with ProxyGen naming pattern in Name tag
+        # Using wildcard to catch proxygen-* instances
+        cmd = [
+            "aws", "ec2", "describe-instances",
+            "--region", region,
+            "--filters",
+            f"Name=tag:Name,Values=proxygen-{region}-*-proxy",
+            "Name=instance-state-name,Values=running",
+            "--query", "Reservations[].Instances[].[InstanceId,PublicIpAddress,InstanceType,Tags[?Key=='Name']|[0].Value,LaunchTime,State.Name]",
+            "--output", "json"
+        ]
+        
+        async with semaphore:
+            output = await self._arun(cmd)
+        instances = _loads(output)
+        
+        for instance in instances:
+            if not instance:
+                continue
+                
+            # Only the Name tag is projected server-side, not the full tag list
+            instance_id, public_ip, instance_type, name_tag, launch_time, state = instance
+            name_tag = name_tag or ""
+            
+            # Validate the Name tag matches our pattern
+            if not name_tag.startswith(self.NAME_PREFIX) or not self._compiled_patterns["aws"].match(name_tag):
+                logger.debug(f"Skipping instance {instance_id} - name '{name_tag}' doesn't match pattern")
+                continue
+            
+            # Extract deployment UID from name (proxygen-region-UID-proxy);
+            # the pattern match guarantees the UID segment is present
+            deployment_uid = name_tag.split("-")[-2]
+            
+            deployment = {
+                "provider": "aws",
+                "region": region,
+                "instance_id": instance_id,
+                "instance_name": name_tag,
+                "public_ip": public_ip,
+                "instance_type": instance_type,
+                "deployment_uid": deployment_uid,
+                "created_at": launch_time,
+                "state": state,
+                "tags": {"Name": name_tag},
+                "discovered_at": discovered_at
+            }
+            
+            deployments.append(deployment)
+            # Use green color for found deployments
+            logger.info(f"\033[92mFound AWS deployment in {region}: {name_tag} ({public_ip})\033[0m")
+
+        return deployments
+
     def discover_azure_deployments(self) -> List[Dict]:
         """Discover Azure Proxy deployments using Azure CLI"""
-        import re
+        if not self._provider_available("azure"):
+            return []
+
         deployments = []
+        discovered_at = datetime.now().isoformat()
         
         try:
-            # Get all resource groups that match proxygen naming pattern
-            # Resource groups are named: proxygen-{region}-{uid}-rg
-            cmd = [
-                "az", "group", "list",
-                "--query", "[?starts_with(name, 'proxygen-')]",
-                "--output", "json"
-            ]
-            
-            result = subprocess.run(cmd, capture_output=True, text=True, check=True)
-            resource_groups = json.loads(result.stdout)
-            
-            for rg in resource_groups:
-                rg_name = rg["name"]
-                location = rg["location"]
-                
-                # Validate resource group name matches pattern: proxygen-{region}-{uid}-rg
-                if not rg_name.startswith("proxygen-") or not rg_name.endswith("-rg"):
-                    continue
-                    
-                logger.info(f"Searching Azure resource group: {rg_name}")
-                
-                # Get VMs in resource group
-                vm_cmd = [
-                    "az", "vm", "list",
-                    "--resource-group", rg_name,
-                    "--show-details",
-                    "--query", "[].{name:name,publicIps:publicIps,vmSize:hardwareProfile.vmSize,id:id,tags:tags}",
-                    "--output", "json"
-                ]
-                
-                result = subprocess.run(vm_cmd, capture_output=True, text=True, check=True)
-                vms = json.loads(result.stdout)
-                
-                pattern = re.compile(self.naming_patterns["azure"])
-                
+            # One Resource Graph query covers every subscription; fall back to
+            # listing resource groups when the resource-graph extension is absent
+            vm_groups = self._list_azure_vms_graph()
+            if vm_groups is None:
+                vm_groups = self._list_azure_vms_by_group()
+
+            pattern = self._compiled_patterns["azure"]
+
+            for rg_name, location, vms in vm_groups:
                 for vm in vms:
                     vm_name = vm["name"]
                     
                     # Validate VM name matches pattern: proxygen-{region}-{uid}-vm
-                    if not pattern.match(vm_name):
+                    if not vm_name.startswith(self.NAME_PREFIX) or not pattern.match(vm_name):
                         logger.debug(f"Skipping VM {vm_name} - doesn't match naming pattern")
                         continue
                     
+                    # Tags come back as null for untagged VMs
+                    tags = vm.get("tags") or {}
+                    
                     # Extract deployment UID from name
                     name_parts = vm_name.split("-")
-                    deployment_uid = name_parts[-2] if len(name_parts) >= 4 else vm.get("tags", {}).get("DeploymentUID", "")
+                    deployment_uid = name_parts[-2] if len(name_parts) >= 4 else tags.get("DeploymentUID", "")
                     
                     deployment = {
                         "provider": "azure",
@@ -192,8 +331,8 @@ class CloudDiscovery:
                         "public_ip": vm["publicIps"] if vm["publicIps"] else None,
                         "instance_type": vm["vmSize"],
                         "deployment_uid": deployment_uid,
-                        "tags": vm.get("tags", {}),
-                        "discovered_at": datetime.now().isoformat()
+                        "tags": tags,
+                        "discovered_at": discovered_at
                     }
                     
                     deployments.append(deployment)
@@ -207,42 +346,239 @@ class CloudDiscovery:
             
         return deployments
 
+    def _list_azure_vms_graph(self) -> Optional[List[Tuple[str, str, List[Dict]]]]:
+        """List ProxyGen VMs through Azure Resource Graph, grouped by resource group
+
+        Returns None if the query cannot be run (e.g. the resource-graph
+        extension is not installed).
+        """
+        base_cmd = [
+            "az", "graph", "query",
+            "-q", self.AZURE_GRAPH_QUERY,
+            "--first", "1000",
+            "--output", "json"
+        ]
+
+        vms: List[Dict] = []
+        skip_token = None
+        while True:
+            cmd = base_cmd + (["--skip-token", skip_token] if skip_token else [])
+            try:
+                result = _loads(self._run(cmd))
+            except (subprocess.CalledProcessError, ValueError) as e:
+                logger.debug(f"Azure Resource Graph unavailable, listing per resource group: {e}")
+                return None
+
+            # Older resource-graph extensions print a bare list and do not page;
+            # newer ones wrap the rows in "data" with a skip token for the next page
+            if isinstance(result, list):
+                vms.extend(result)
+                break
+            if not isinstance(result, dict):
+                logger.debug("Unexpected Azure Resource Graph output, listing per resource group")
+                return None
+
+            vms.extend(result.get("data") or [])
+            skip_token = result.get("skip_token") or result.get("skipToken")
+            if not skip_token:
+                break
+
+        groups: Dict[Tuple[str, str], List[Dict]] = {}
+        for vm in vms:
+            groups.setdefault((vm["resourceGroup"], vm["location"]), []).append(vm)
+        return [(rg_name, location, vms) for (rg_name, location), vms in groups.items()]
+
+    def _list_azure_vms_by_group(self) -> List[Tuple[str, str, List[Dict]]]:
+        """List ProxyGen VMs with one az vm list per resource group"""
+        # Get all resource groups that match proxygen naming pattern
+        # Resource groups are named: proxygen-{region}-{uid}-rg
+        cmd = [
+            "az", "group", "list",
+            "--query", "[?starts_with(name, 'proxygen-')]",
+            "--output", "json"
+        ]
+        
+        resource_groups = _loads(self._run(cmd))
+        
+        # Validate resource group names match pattern: proxygen-{region}-{uid}-rg
+        resource_groups = [
+            rg for rg in resource_groups
+            if rg["name"].startswith("proxygen-") and rg["name"].endswith("-rg")
+        ]
+
+        # List VMs in every resource group concurrently
+        vm_lists = asyncio.run(self._alist_azure_vms(resource_groups))
+
+        return [
+            (rg["name"], rg["location"], vms)
+            for rg, vms in zip(resource_groups, vm_lists)
+        ]
+
+    async def _alist_azure_vms(self, resource_groups: List[Dict]) -> List[List[Dict]]:
+        """List the VMs of each resource group concurrently"""
+        semaphore = asyncio.Semaphore(self.PROVIDER_CONCURRENCY["azure"])
+
+        async def list_vms(rg_name: str) -> List[Dict]:
+            logger.info(f"Searching Azure resource group: {rg_name}")
+            vm_cmd = [
+                "az", "vm", "list",
+                "--resource-group", rg_name,
+                "--show-details",
+                "--query", "[].{name:name,publicIps:publicIps,vmSize:hardwareProfile.vmSize,id:id,tags:tags}",
+                "--output", "json"
+            ]
+            async with semaphore:
+                output = await self._arun(vm_cmd)
+            return _loads(output)
+
+        return await asyncio.gather(*(list_vms(rg["name"]) for rg in resource_groups))
+
+    def _cache_file(self, cmd: List[str]) -> Path:
+        """Cache file holding the output of a CLI command"""
+        digest = hashlib.sha1("\0".join(cmd).encode()).hexdigest()
+        return self.cache_dir / f"{digest}.out"
+
+    def _read_cache(self, cmd: List[str]) -> Optional[str]:
+        """Return cached output for a command if it is younger than the TTL"""
+        if self._no_cache or self.cache_ttl <= 0:
+            return None
+        cache_file = self._cache_file(cmd)
+        try:
+            if time.time() - cache_file.stat().st_mtime > self.cache_ttl:
+                return None
+            return cache_file.read_text()
+        except OSError:
+            return None
+
+    def _write_cache(self, cmd: List[str], output: str):
+        """Store command output, ignoring an unwritable cache directory"""
+        if self.cache_ttl <= 0:
+            return
+        cache_file = self._cache_file(cmd)
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            tmp_file = cache_file.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+            tmp_file.write_text(output)
+            os.replace(tmp_file, cache_file)
+        except OSError as e:
+            logger.debug(f"Could not write discovery cache: {e}")
+
+    def _run(self, cmd: List[str]) -> str:
+        """Run a CLI command and return stdout, served from cache within the TTL"""
+        output = self._read_cache(cmd)
+        if output is None:
+            result = subprocess.run(cmd, capture_output=True, text=True, check=True)
+            output = result.stdout
+            self._write_cache(cmd, output)
+        return output
+
+    async def _arun(self, cmd: List[str]) -> str:
+        """Run a CLI command without blocking the event loop and return stdout"""
+        output = self._read_cache(cmd)
+        if output is not None:
+            return output
+
+        for attempt in range(self.THROTTLE_RETRIES + 1):
+            proc = await asyncio.create_subprocess_exec(
+                *cmd,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE,
+            )
+            stdout, stderr = await proc.communicate()
+            if proc.returncode == 0:
+                break
+            throttled = any(marker in stderr for marker in self.THROTTLE_MARKERS)
+            if not throttled or attempt == self.THROTTLE_RETRIES:
+                raise subprocess.CalledProcessError(
+                    proc.returncode, cmd, output=stdout, stderr=stderr
+                )
+            delay = self.THROTTLE_BACKOFF * 2 ** attempt
+            logger.debug(f"Throttled running {cmd[0]}, retrying in {delay:.0f}s")
+            await asyncio.sleep(delay)
+        output = stdout.decode()
+        self._write_cache(cmd, output)
+        return output
+
+    def _api_get(self, url: str, token: str) -> str:
+        """GET a provider API URL and return the body, served from cache within the TTL"""
+        # Key on a digest of the token so separate accounts, or a rotated
+        # token, never read each other's cached responses
+        cache_key = ["GET", url, hashlib.sha256(token.encode()).hexdigest()[:16]]
+        body = self._read_cache(cache_key)
+        if body is None:
+            request = urllib.request.Request(
+                url,
+                headers={
+                    "Authorization": f"Bearer {token}",
+                    "Accept": "application/json",
+                },
+            )
+            with urllib.request.urlopen(request, timeout=self.API_TIMEOUT) as response:
+                body = response.read().decode()
+            self._write_cache(cache_key, body)
+        return body
+
+    def _list_digitalocean_droplets(self, token: str) -> Iterator[Dict]:
+        """Yield ProxyGen-tagged droplets from the DigitalOcean API, following pagination"""
+        url = f"{self.DIGITALOCEAN_API}/droplets?" + urlencode(
+            {"tag_name": self.project_name, "per_page": 200}
+        )
+        while url:
+            page = _loads(self._api_get(url, token))
+            yield from page.get("droplets", [])
+            url = page.get("links", {}).get("pages", {}).get("next")
+
+    def _iter_digitalocean_droplets(self) -> Iterator[Tuple[str, ...]]:
+        """Yield (id, name, public_ip, region, size, status, created_at) per droplet"""
+        token = os.environ.get("DIGITALOCEAN_ACCESS_TOKEN")
+        if token:
+            for droplet in self._list_digitalocean_droplets(token):
+                public_ip = next(
+                    (
+                        network["ip_address"]
+                        for network in droplet.get("networks", {}).get("v4", [])
+                        if network.get("type") == "public"
+                    ),
+                    "",
+                )
+                yield (
+                    str(droplet["id"]),
+                    droplet["name"],
+                    public_ip,
+                    droplet["region"]["slug"],
+                    droplet["size_slug"],
+                    droplet["status"],
+                    droplet["created_at"],
+                )
+            return
+
+        # No token: fall back to doctl and its whitespace-delimited output
+        cmd = [
+            "doctl", "compute", "droplet", "list",
+            "--format", "ID,Name,PublicIPv4,Region,Size,Status,CreatedAt",
+            "--no-header"
+        ]
+
+        for line in self._run(cmd).strip().split("\n"):
+            parts = line.split()
+            if len(parts) < 7:
+                continue
+            yield (*parts[:6], " ".join(parts[6:]))
+
     def discover_digitalocean_deployments(self) -> List[Dict]:
-        """Discover DigitalOcean Proxy deployments using doctl CLI"""
-        import re
+        """Discover DigitalOcean Proxy deployments using the API or doctl CLI"""
+        if not self._provider_available("digitalocean"):
+            return []
+
         deployments = []
+        discovered_at = datetime.now().isoformat()
         
         try:
-            # List all droplets with names starting with proxygen-
-            cmd = [
-                "doctl", "compute", "droplet", "list",
-                "--format", "ID,Name,PublicIPv4,Region,Size,Status,CreatedAt",
-                "--no-header"
-            ]
-            
-            result = subprocess.run(cmd, capture_output=True, text=True, check=True)
-            lines = result.stdout.strip().split("\n")
-            
-            pattern = re.compile(r"^proxygen-.*")
+            droplets = self._iter_digitalocean_droplets()
             
-            for line in lines:
-                if not line:
-                    continue
-                    
-                parts = line.split()
-                if len(parts) < 7:
-                    continue
-                    
-                droplet_id = parts[0]
-                droplet_name = parts[1]
-                public_ip = parts[2]
-                region = parts[3]
-                size = parts[4]
-                status = parts[5]
-                created_at = " ".join(parts[6:])
-                
+            for droplet_id, droplet_name, public_ip, region, size, status, created_at in droplets:
                 # Check if name matches pattern
-                if not pattern.match(droplet_name):
+                if not droplet_name.startswith(self.NAME_PREFIX):
                     continue
                 
                 # Extract deployment UID from name
@@ -259,7 +595,7 @@ class CloudDiscovery:
                     "deployment_uid": deployment_uid,
                     "created_at": created_at,
                     "status": status,
-                    "discovered_at": datetime.now().isoformat()
+                    "discovered_at": discovered_at
                 }
                 
                 deployments.append(deployment)
@@ -267,51 +603,68 @@ class CloudDiscovery:
                 
         except subprocess.CalledProcessError as e:
             logger.warning(f"DigitalOcean CLI error: {e}")
+        except urllib.error.URLError as e:
+            logger.warning(f"DigitalOcean API error: {e}")
         except Exception as e:
             logger.error(f"Error discovering DigitalOcean deployments: {e}")
             
         return deployments
     
+    def _list_hetzner_servers(self, token: str) -> Iterator[Dict]:
+        """Yield ProxyGen-labelled servers from the Hetzner Cloud API, following pagination"""
+        params = {"label_selector": f"project={self.project_name}", "per_page": 50, "page": 1}
+        while params["page"]:
+            url = f"{self.HETZNER_API}/servers?" + urlencode(params)
+            page = _loads(self._api_get(url, token))
+            yield from page.get("servers", [])
+            params["page"] = page.get("meta", {}).get("pagination", {}).get("next_page")
+
     def discover_hetzner_deployments(self) -> List[Dict]:
-        """Discover Hetzner Proxy deployments using hcloud CLI"""
-        import re
+        """Discover Hetzner Proxy deployments using the API or hcloud CLI"""
+        if not self._provider_available("hetzner"):
+            return []
+
         deployments = []
+        discovered_at = datetime.now().isoformat()
         
         try:
-            # List all servers with names starting with proxygen-
-            cmd = [
-                "hcloud", "server", "list",
-                "-o", "json"
-            ]
-            
-            result = subprocess.run(cmd, capture_output=True, text=True, check=True)
-            servers = json.loads(result.stdout)
-            
-            pattern = re.compile(r"^proxygen-.*")
+            token = os.environ.get("HCLOUD_TOKEN")
+            if token:
+                servers = self._list_hetzner_servers(token)
+            else:
+                # List all servers with names starting with proxygen-
+                cmd = [
+                    "hcloud", "server", "list",
+                    "-o", "json"
+                ]
+                
+                servers = _loads(self._run(cmd))
             
             for server in servers:
                 server_name = server["name"]
                 
                 # Check if name matches pattern
-                if not pattern.match(server_name):
+                if not server_name.startswith(self.NAME_PREFIX):
                     continue
                 
                 # Extract deployment UID from name
                 name_parts = server_name.split("-")
                 deployment_uid = name_parts[-1] if len(name_parts) >= 3 else ""
                 
+                ipv4 = (server.get("public_net") or {}).get("ipv4")
+                
                 deployment = {
                     "provider": "hetzner",
                     "region": server["datacenter"]["location"]["name"],
                     "instance_name": server_name,
                     "instance_id": str(server["id"]),
-                    "public_ip": server["public_net"]["ipv4"]["ip"] if server.get("public_net", {}).get("ipv4") else None,
+                    "public_ip": ipv4["ip"] if ipv4 else None,
                     "instance_type": server["server_type"]["name"],
                     "deployment_uid": deployment_uid,
                     "created_at": server["created"],
                     "status": server["status"],
                     "labels": server.get("labels", {}),
-                    "discovered_at": datetime.now().isoformat()
+                    "discovered_at": discovered_at
                 }
                 
                 deployments.append(deployment)
@@ -319,6 +672,8 @@ class CloudDiscovery:
                 
         except subprocess.CalledProcessError as e:
             logger.warning(f"Hetzner CLI error: {e}")
+        except urllib.error.URLError as e:
+            logger.warning(f"Hetzner API error: {e}")
         except Exception as e:
             logger.error(f"Error discovering Hetzner deployments: {e}")
             
@@ -332,62 +687,71 @@ class CloudDiscovery:
             from .deployment_tracker import DeploymentTracker
             tracker = DeploymentTracker(self.base_dir)
             
+            # Index the inventory once per (provider, region) by the field
+            # that identifies a resource for that provider; each region is
+            # looked up once however many deployments it holds
+            known = set()
             for provider, provider_deployments in deployments.items():
-                for deployment in provider_deployments:
-                    # Check if already in inventory
-                    existing = tracker.get_deployments_by_region(
-                        deployment["provider"], 
-                        deployment["region"]
-                    )
-                    
-                    # Check if this specific deployment exists
-                    exists = False
-                    for existing_dep in existing:
-                        if provider == "aws" and existing_dep.get("resources", {}).get("instance_id") == deployment.get("instance_id"):
-                            exists = True
-                            break
-                        elif provider == "azure" and existing_dep.get("resources", {}).get("vm_name") == deployment.get("vm_name"):
-                            exists = True
-                            break
-                        elif provider in ["digitalocean", "hetzner"] and existing_dep.get("resources", {}).get("instance_name") == deployment.get("instance_name"):
-                            exists = True
-                            break
+                id_field = self.IDENTIFIER_FIELDS.get(provider)
+                if id_field is None:
+                    continue
+                regions = {deployment["region"] for deployment in provider_deployments}
+                for region in regions:
+                    for existing_dep in tracker.get_deployments_by_region(provider, region):
+                        known.add((
+                            provider,
+                            region,
+                            existing_dep.get("resources", {}).get(id_field),
+                        ))
+
+            # Write the IP registry once for the whole import
+            with tracker.ip_manager.batch():
+                for provider, provider_deployments in deployments.items():
+                    id_field = self.IDENTIFIER_FIELDS.get(provider)
+                    for deployment in provider_deployments:
+                        # Check if this specific deployment is already in inventory
+                        key = (
+                            deployment["provider"],
+                            deployment["region"],
+                            deployment.get(id_field),
+                        )
                     
-                    if not exists:
-                        # Create deployment record
-                        deployment_id = self._generate_deployment_id(deployment)
+                        if id_field is None or key not in known:
+                            # Create deployment record
+                            deployment_id = self._generate_deployment_id(deployment)
                         
-                        resources = {
-                            "public_ip": deployment.get("public_ip"),
-                            "discovered": True,  # Mark as discovered vs created
-                        }
+                            resources = {
+                                "public_ip": deployment.get("public_ip"),
+                                "discovered": True,  # Mark as discovered vs created
+                            }
                         
-                        if provider == "aws":
-                            resources["instance_id"] = deployment["instance_id"]
-                        elif provider == "azure":
-                            resources["vm_name"] = deployment["vm_name"]
-                            resources["resource_group"] = deployment["resource_group"]
-                        elif provider in ["digitalocean", "hetzner"]:
-                            resources["instance_name"] = deployment["instance_name"]
-                            resources["instance_id"] = deployment["instance_id"]
+                            if provider == "aws":
+                                resources["instance_id"] = deployment["instance_id"]
+                            elif provider == "azure":
+                                resources["vm_name"] = deployment["vm_name"]
+                                resources["resource_group"] = deployment["resource_group"]
+                            elif provider in ["digitalocean", "hetzner"]:
+                                resources["instance_name"] = deployment["instance_name"]
+                                resources["instance_id"] = deployment["instance_id"]
                         
-                        config = {
-                            "instance_type": deployment.get("instance_type"),
-                            "deployment_uid": deployment.get("deployment_uid"),
-                        }
+                            config = {
+                                "instance_type": deployment.get("instance_type"),
+                                "deployment_uid": deployment.get("deployment_uid"),
+                            }
                         
-                        tracker.add_deployment(
-                            deployment_id,
-                            deployment["provider"],
-                            deployment["region"],
-                            resources,
-                            config
-                        )
+                            tracker.add_deployment(
+                                deployment_id,
+                                deployment["provider"],
+                                deployment["region"],
+                                resources,
+                                config
+                            )
                         
-                        imported_count += 1
-                        logger.info(f"Imported deployment: {deployment_id}")
-                    else:
-                        logger.debug(f"Deployment already in inventory: {deployment['provider']}-{deployment['region']}")
+                            known.add(key)
+                            imported_count += 1
+                            logger.info(f"Imported deployment: {deployment_id}")
+                        else:
+                            logger.debug(f"Deployment already in inventory: {deployment['provider']}-{deployment['region']}")
                         
         except Exception as e:
             logger.error(f"Error importing deployments: {e}")
@@ -404,16 +768,28 @@ class CloudDiscovery:
             return f"{provider}-{region}-{uid}"
         else:
             # Use timestamp from creation or discovery
-            timestamp = deployment.get("created_at", deployment.get("discovered_at", ""))
+            timestamp = deployment.get("created_at") or deployment.get("discovered_at") or ""
             if timestamp:
                 # Extract date portion
-                date_str = timestamp.split("T")[0].replace("-", "")
+                date_str = timestamp.partition("T")[0].replace("-", "")
                 return f"{provider}-{region}-{date_str}-discovered"
             else:
                 return f"{provider}-{region}-discovered"
 
-    def sync_with_cloud(self, provider: Optional[str] = None) -> Dict:
-        """Sync local inventory with cloud resources"""
+    def sync_with_cloud(self, provider: Optional[str] = None, no_cache: bool = False) -> Dict:
+        """Sync local inventory with cloud resources
+
+        Pass no_cache=True to ignore cached CLI responses and query the
+        providers afresh (the fresh responses still refresh the cache).
+        """
+        self._no_cache = no_cache
+        try:
+            return self._sync_with_cloud(provider)
+        finally:
+            self._no_cache = False
+
+    def _sync_with_cloud(self, provider: Optional[str]) -> Dict:
+        """Discover and import deployments for sync_with_cloud"""
         results = {
             "discovered": 0,
             "imported": 0,
@@ -445,8 +821,7 @@ class CloudDiscovery:
             all_deployments = self.discover_all_deployments()
             results["deployments"] = all_deployments
             
-            for provider_deps in all_deployments.values():
-                results["discovered"] += len(provider_deps)
+            results["discovered"] = sum(map(len, all_deployments.values()))
                 
             results["imported"] = self.import_discovered_deployments(all_deployments)
         
@@ -488,8 +863,7 @@ class CloudDiscovery:
                 "--output", "json"
             ]
             
-            result = subprocess.run(cmd, capture_output=True, text=True, check=True)
-            instances = json.loads(result.stdout)
+            instances = _loads(self._run(cmd))
             
             if instances:
                 return instances[0]  # Return first matching instance
@@ -509,8 +883,7 @@ class CloudDiscovery:
                 "--output", "json"
             ]
             
-            result = subprocess.run(cmd, capture_output=True, text=True, check=True)
-            resource_groups = json.loads(result.stdout)
+            resource_groups = _loads(self._run(cmd))
             
             for rg in resource_groups:
                 # Get VMs in resource group
@@ -521,8 +894,7 @@ class CloudDiscovery:
                     "--output", "json"
                 ]
                 
-                result = subprocess.run(vm_cmd, capture_output=True, text=True, check=True)
-                vms = json.loads(result.stdout)
+                vms = _loads(self._run(vm_cmd))
                 
                 if deployment_id:
                     # Filter by deployment ID
@@ -540,11 +912,25 @@ class CloudDiscovery:
     def _get_digitalocean_state(self, region: str, deployment_id: Optional[str] = None) -> Optional[Dict]:
         """Get DigitalOcean droplet state"""
         try:
-            cmd = ["doctl", "compute", "droplet", "list", "--format", "Status", "--no-header"]
+            # Filter on the project tag server-side, then by region and the
+            # deployment UID that ends each droplet name
+            token = os.environ.get("DIGITALOCEAN_ACCESS_TOKEN")
+            if token:
+                droplets = self._list_digitalocean_droplets(token)
+            else:
+                cmd = [
+                    "doctl", "compute", "droplet", "list",
+                    "--tag-name", self.project_name,
+                    "-o", "json"
+                ]
+                droplets = _loads(self._run(cmd))
             
-            result = subprocess.run(cmd, capture_output=True, text=True, check=True)
-            if result.stdout.strip():
-                return {"status": result.stdout.strip()}
+            for droplet in droplets:
+                if droplet["region"]["slug"] != region:
+                    continue
+                if deployment_id and not droplet["name"].endswith(f"-{deployment_id}"):
+                    continue
+                return droplet
             
         except Exception as e:
             logger.error(f"Error getting DigitalOcean state: {e}")
@@ -556,8 +942,7 @@ class CloudDiscovery:
         try:
             cmd = ["hcloud", "server", "list", "-o", "json"]
             
-            result = subprocess.run(cmd, capture_output=True, text=True, check=True)
-            servers = json.loads(result.stdout)
+            servers = _loads(self._run(cmd))
             
             for server in servers:
                 if deployment_id and server.get("labels", {}).get("uid") == deployment_id:
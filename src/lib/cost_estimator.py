@@ -4,147 +4,280 @@ Cost Estimator and Optimisation for ProxyGen
 Provides cost estimation and optimisation recommendations across cloud providers
 """
 
+import time
+from bisect import bisect_left, bisect_right
+from collections import defaultdict
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Any, Dict, List, Mapping, NamedTuple, Optional, Tuple
+
+
+# Instance type and region assumed for each provider when none is given
+DEFAULT_INSTANCE = {
+    "aws": "t3.micro",
+    "azure": "Standard_B1s",
+    "digitalocean": "s-1vcpu-1gb",
+    "hetzner": "cx11",
+}
+DEFAULT_REGION = {
+    "aws": "us-east-1",
+    "azure": "eastus",
+    "digitalocean": "nyc1",
+    "hetzner": "fsn1",
+}
+
+
+def _freeze(value: Any) -> Any:
+    """Return a read-only view of nested dicts"""
+    if isinstance(value, dict):
+        return MappingProxyType({key: _freeze(item) for key, item in value.items()})
+    return value
+
+
+# (monotonic time, ISO timestamp) of the last timestamp handed out
+_last_timestamp = (float("-inf"), "")
+
+
+def _timestamp() -> str:
+    """Current time in ISO format, reused for up to a second"""
+    global _last_timestamp
+    now = time.monotonic()
+    if now - _last_timestamp[0] > 1.0:
+        _last_timestamp = (now, datetime.now().isoformat())
+    return _last_timestamp[1]
+
+
+# Pricing data (as of 2024, prices in USD per hour); read-only, since the
+# derived lookup tables and cached estimates are built from it
+_PRICING = _freeze({
+    "aws": {
+        "instances": {
+            "t3.micro": 0.0104,
+            "t3.small": 0.0208,
+            "t3.medium": 0.0416,
+            "t3.large": 0.0832,
+            "t3.xlarge": 0.1664,
+            "t4g.micro": 0.0084,  # ARM-based, cheaper
+            "t4g.small": 0.0168,
+            "t4g.medium": 0.0336,
+        },
+        "bandwidth": {
+            "first_10tb": 0.09,  # per GB
+            "next_40tb": 0.085,
+            "next_100tb": 0.07,
+            "over_150tb": 0.05,
+        },
+        "storage": {"gp3": 0.08, "gp2": 0.10},  # per GB per month
+        "ip": 0.005,  # per hour for elastic IP
+        "regions": {
+            "us-east-1": 1.0,  # baseline
+            "us-west-2": 1.0,
+            "eu-west-1": 1.1,
+            "eu-central-1": 1.15,
+            "ap-southeast-1": 1.2,
+            "ap-northeast-1": 1.25,
+            "sa-east-1": 1.4,
+        },
+    },
+    "azure": {
+        "instances": {
+            "Standard_B1s": 0.0104,
+            "Standard_B1ms": 0.0207,
+            "Standard_B2s": 0.0416,
+            "Standard_B2ms": 0.0832,
+            "Standard_B4ms": 0.1664,
+            "Standard_D2s_v5": 0.096,
+            "Standard_D4s_v5": 0.192,
+        },
+        "bandwidth": {
+            "first_5gb": 0.0,  # free
+            "next_10tb": 0.087,
+            "next_40tb": 0.083,
+            "next_100tb": 0.07,
+            "over_150tb": 0.05,
+        },
+        "storage": {
+            "standard_ssd": 0.12,  # per GB per month
+            "premium_ssd": 0.20,
+        },
+        "ip": 0.004,  # per hour for public IP
+        "regions": {
+            "eastus": 1.0,
+            "westus2": 1.0,
+            "westeurope": 1.1,
+            "northeurope": 1.08,
+            "southeastasia": 1.15,
+            "japaneast": 1.25,
+            "brazilsouth": 1.35,
+        },
+    },
+    "digitalocean": {
+        "instances": {
+            "s-1vcpu-1gb": 0.00833,  # $6/month
+            "s-1vcpu-2gb": 0.01667,  # $12/month
+            "s-2vcpu-2gb": 0.02500,  # $18/month
+            "s-2vcpu-4gb": 0.03333,  # $24/month
+            "s-4vcpu-8gb": 0.06667,  # $48/month
+            "c-2": 0.04167,  # $30/month CPU-optimized
+            "c-4": 0.08333,  # $60/month CPU-optimized
+        },
+        "bandwidth": {
+            "first_1000gb": 0.0,  # 1TB free
+            "over_1000gb": 0.01,  # $0.01 per GB
+        },
+        "storage": {"standard": 0.10},  # $0.10 per GB per month
+        "ip": 0.0,  # Floating IPs are free
+        "regions": {
+            "nyc1": 1.0,
+            "nyc3": 1.0,
+            "sfo1": 1.0,
+            "sfo2": 1.0,
+            "sfo3": 1.0,
+            "ams2": 1.0,
+            "ams3": 1.0,
+            "sgp1": 1.0,
+            "lon1": 1.0,
+            "fra1": 1.0,
+            "tor1": 1.0,
+            "blr1": 1.0,
+            "syd1": 1.0,
+        },
+    },
+    "hetzner": {
+        "instances": {
+            "cx11": 0.00500,  # ~€3.29/month
+            "cx21": 0.00889,  # ~€5.83/month
+            "cx31": 0.01611,  # ~€10.59/month
+            "cx41": 0.03056,  # ~€20.09/month
+            "cx51": 0.05958,  # ~€39.19/month
+            "cpx11": 0.00639,  # ~€4.20/month shared vCPU
+            "cpx21": 0.01139,  # ~€7.49/month shared vCPU
+            "cpx31": 0.02083,  # ~€13.70/month shared vCPU
+        },
+        "bandwidth": {
+            "first_20tb": 0.0,  # 20TB free
+            "over_20tb": 0.001,  # €1 per TB
+        },
+        "storage": {"standard": 0.05},  # Included in instance price
+        "ip": 0.0,  # Floating IPs included
+        "regions": {
+            "fsn1": 1.0,  # Falkenstein, Germany
+            "nbg1": 1.0,  # Nuremberg, Germany
+            "hel1": 1.0,  # Helsinki, Finland
+            "ash": 1.1,   # Ashburn, USA (slightly more expensive)
+            "hil": 1.1,   # Hillsboro, USA
+        },
+    },
+})
+
+# Optimisation thresholds
+_OPTIMISATION_THRESHOLDS = _freeze({
+    "cpu_utilisation_low": 20,  # %
+    "cpu_utilisation_high": 80,  # %
+    "bandwidth_high": 1000,  # GB per month
+    "cost_savings_minimum": 10,  # % minimum savings to recommend
+})
+
+
+class _ProviderRates(NamedTuple):
+    """Flattened per-provider rates used when computing an estimate"""
+
+    instances: Mapping[str, float]
+    regions: Mapping[str, float]
+    ip: float
+    storage: float
+
+
+class _MonthlyCost(NamedTuple):
+    """Unrounded monthly cost components for one configuration"""
+
+    instance: float
+    ip_address: float
+    bandwidth: float
+    storage: float
+    total: float
 
 
 class CostEstimator:
     """Estimate and optimise cloud infrastructure costs"""
 
+    # Bandwidth pricing tiers per provider as (pricing key, tier width in GB),
+    # in ascending order; the open-ended top tier has no width
+    BANDWIDTH_TIERS = {
+        "aws": (
+            ("first_10tb", 10240),
+            ("next_40tb", 40960),
+            ("next_100tb", 102400),
+            ("over_150tb", None),
+        ),
+        "azure": (
+            ("first_5gb", 5),
+            ("next_10tb", 10240),
+            ("next_40tb", 40960),
+            ("next_100tb", 102400),
+            ("over_150tb", None),
+        ),
+        "digitalocean": (("first_1000gb", 1000), ("over_1000gb", None)),
+        "hetzner": (("first_20tb", 20480), ("over_20tb", None)),
+    }
+
+    # Hetzner's rate is per 1/1000 of a 1024 GB TB, not per GB
+    BANDWIDTH_RATE_SCALE = {"hetzner": 1000 / 1024}
+
+    # AWS Graviton (ARM) counterparts of x86 instance types
+    ARM_EQUIVALENTS = {
+        "t3.micro": "t4g.micro",
+        "t3.small": "t4g.small",
+        "t3.medium": "t4g.medium",
+    }
+
     def __init__(self):
         # Load real-time pricing if available
         self._load_pricing_updates()
         
-        # Pricing data (as of 2024, prices in USD per hour)
-        self.pricing = {
-            "aws": {
-                "instances": {
-                    "t3.micro": 0.0104,
-                    "t3.small": 0.0208,
-                    "t3.medium": 0.0416,
-                    "t3.large": 0.0832,
-                    "t3.xlarge": 0.1664,
-                    "t4g.micro": 0.0084,  # ARM-based, cheaper
-                    "t4g.small": 0.0168,
-                    "t4g.medium": 0.0336,
-                },
-                "bandwidth": {
-                    "first_10tb": 0.09,  # per GB
-                    "next_40tb": 0.085,
-                    "next_100tb": 0.07,
-                    "over_150tb": 0.05,
-                },
-                "storage": {"gp3": 0.08, "gp2": 0.10},  # per GB per month
-                "ip": 0.005,  # per hour for elastic IP
-                "regions": {
-                    "us-east-1": 1.0,  # baseline
-                    "us-west-2": 1.0,
-                    "eu-west-1": 1.1,
-                    "eu-central-1": 1.15,
-                    "ap-southeast-1": 1.2,
-                    "ap-northeast-1": 1.25,
-                    "sa-east-1": 1.4,
-                },
-            },
-            "azure": {
-                "instances": {
-                    "Standard_B1s": 0.0104,
-                    "Standard_B1ms": 0.0207,
-                    "Standard_B2s": 0.0416,
-                    "Standard_B2ms": 0.0832,
-                    "Standard_B4ms": 0.1664,
-                    "Standard_D2s_v5": 0.096,
-                    "Standard_D4s_v5": 0.192,
-                },
-                "bandwidth": {
-                    "first_5gb": 0.0,  # free
-                    "next_10tb": 0.087,
-                    "next_40tb": 0.083,
-                    "next_100tb": 0.07,
-                    "over_150tb": 0.05,
-                },
-                "storage": {
-                    "standard_ssd": 0.12,  # per GB per month
-                    "premium_ssd": 0.20,
-                },
-                "ip": 0.004,  # per hour for public IP
-                "regions": {
-                    "eastus": 1.0,
-                    "westus2": 1.0,
-                    "westeurope": 1.1,
-                    "northeurope": 1.08,
-                    "southeastasia": 1.15,
-                    "japaneast": 1.25,
-                    "brazilsouth": 1.35,
-                },
-            },
-            "digitalocean": {
-                "instances": {
-                    "s-1vcpu-1gb": 0.00833,  # $6/month
-                    "s-1vcpu-2gb": 0.01667,  # $12/month
-                    "s-2vcpu-2gb": 0.02500,  # $18/month
-                    "s-2vcpu-4gb": 0.03333,  # $24/month
-                    "s-4vcpu-8gb": 0.06667,  # $48/month
-                    "c-2": 0.04167,  # $30/month CPU-optimized
-                    "c-4": 0.08333,  # $60/month CPU-optimized
-                },
-                "bandwidth": {
-                    "first_1000gb": 0.0,  # 1TB free
-                    "over_1000gb": 0.01,  # $0.01 per GB
-                },
-                "storage": {"standard": 0.10},  # $0.10 per GB per month
-                "ip": 0.0,  # Floating IPs are free
-                "regions": {
-                    "nyc1": 1.0,
-                    "nyc3": 1.0,
-                    "sfo1": 1.0,
-                    "sfo2": 1.0,
-                    "sfo3": 1.0,
-                    "ams2": 1.0,
-                    "ams3": 1.0,
-                    "sgp1": 1.0,
-                    "lon1": 1.0,
-                    "fra1": 1.0,
-                    "tor1": 1.0,
-                    "blr1": 1.0,
-                    "syd1": 1.0,
-                },
-            },
-            "hetzner": {
-                "instances": {
-                    "cx11": 0.00500,  # ~€3.29/month
-                    "cx21": 0.00889,  # ~€5.83/month
-                    "cx31": 0.01611,  # ~€10.59/month
-                    "cx41": 0.03056,  # ~€20.09/month
-                    "cx51": 0.05958,  # ~€39.19/month
-                    "cpx11": 0.00639,  # ~€4.20/month shared vCPU
-                    "cpx21": 0.01139,  # ~€7.49/month shared vCPU
-                    "cpx31": 0.02083,  # ~€13.70/month shared vCPU
-                },
-                "bandwidth": {
-                    "first_20tb": 0.0,  # 20TB free
-                    "over_20tb": 0.001,  # €1 per TB
-                },
-                "storage": {"standard": 0.05},  # Included in instance price
-                "ip": 0.0,  # Floating IPs included
-                "regions": {
-                    "fsn1": 1.0,  # Falkenstein, Germany
-                    "nbg1": 1.0,  # Nuremberg, Germany
-                    "hel1": 1.0,  # Helsinki, Finland
-                    "ash": 1.1,   # Ashburn, USA (slightly more expensive)
-                    "hil": 1.1,   # Hillsboro, USA
-                },
-            },
+        # Pricing and the tables derived from it are shared, read-only, by
+        # every estimator
+        self.pricing = _PRICING
+        self.optimisation_thresholds = _OPTIMISATION_THRESHOLDS
+
+    @classmethod
+    def _build_pricing_tables(cls):
+        """Derive the lookup tables used by estimates from _PRICING"""
+        # Instance types per provider in ascending price order, with the
+        # matching prices, for bisecting smaller / larger alternatives
+        cls._sorted_instances = {}
+        for provider, provider_pricing in _PRICING.items():
+            ranked = sorted(provider_pricing["instances"].items(), key=lambda item: item[1])
+            cls._sorted_instances[provider] = (
+                [price for _, price in ranked],
+                [name for name, _ in ranked],
+            )
+
+        # Storage is priced at each provider's first listed storage rate
+        cls._default_storage_rate = {
+            provider: next(iter(provider_pricing["storage"].values()))
+            for provider, provider_pricing in _PRICING.items()
         }
 
-        # Optimisation thresholds
-        self.optimisation_thresholds = {
-            "cpu_utilisation_low": 20,  # %
-            "cpu_utilisation_high": 80,  # %
-            "bandwidth_high": 1000,  # GB per month
-            "cost_savings_minimum": 10,  # % minimum savings to recommend
+        # One lookup per estimate for everything but bandwidth, instead of
+        # walking the nested pricing dicts
+        cls._rates = {
+            provider: _ProviderRates(
+                provider_pricing["instances"],
+                provider_pricing["regions"],
+                provider_pricing["ip"],
+                cls._default_storage_rate[provider],
+            )
+            for provider, provider_pricing in _PRICING.items()
         }
 
+        # Cumulative cost table per provider for tiered bandwidth pricing
+        cls._bw_tables = cls._build_bandwidth_tables()
+
+        # Almost all AWS estimates fall in the first 10TB tier
+        cls._aws_first_tier_rate = _PRICING["aws"]["bandwidth"]["first_10tb"]
+
     def estimate_monthly_cost(
         self,
         provider: str,
@@ -155,99 +288,148 @@ class CostEstimator:
         hours_per_month: float = 730,
     ) -> Dict:
         """Estimate monthly cost for a Proxy server"""
+        cost = self._compute_monthly_cost(
+            provider, instance_type, region, bandwidth_gb, storage_gb, hours_per_month
+        )
 
-        if provider not in self.pricing:
-            raise ValueError(f"Unknown provider: {provider}")
+        return self._estimate(provider, instance_type, region, cost)
 
-        provider_pricing = self.pricing[provider]
+    def estimate_monthly_cost_batch(
+        self,
+        provider: str,
+        instance_type: str,
+        region: str,
+        usage: List[Tuple[float, float]],
+        hours_per_month: float = 730,
+    ) -> List[Dict]:
+        """Estimate monthly cost for several (bandwidth_gb, storage_gb) pairs"""
+        costs = self._compute_monthly_cost_batch(
+            provider, instance_type, region, usage, hours_per_month
+        )
+        return [self._estimate(provider, instance_type, region, cost) for cost in costs]
+
+    def _estimate(
+        self, provider: str, instance_type: str, region: str, cost: _MonthlyCost
+    ) -> Dict:
+        """Build the estimate dict returned for a computed monthly cost"""
+        return {
+            "provider": provider,
+            "region": region,
+            "instance_type": instance_type,
+            "breakdown": self._breakdown(cost),
+            "total_monthly": round(cost.total, 2),
+            "total_yearly": round(cost.total * 12, 2),
+            "currency": "USD",
+            "estimated_at": _timestamp(),
+        }
+
+    @staticmethod
+    def _breakdown(cost: _MonthlyCost) -> Dict[str, float]:
+        """Rounded per-component breakdown of a monthly cost"""
+        return {
+            "instance": round(cost.instance, 2),
+            "ip_address": round(cost.ip_address, 2),
+            "bandwidth": round(cost.bandwidth, 2),
+            "storage": round(cost.storage, 2),
+        }
+
+    # Reports, comparisons and budget sweeps estimate the same handful of
+    # configurations repeatedly. Estimates depend only on the read-only
+    # class-level tables, so one cache serves every estimator
+    @classmethod
+    @lru_cache(maxsize=1024)
+    def _compute_monthly_cost(
+        cls,
+        provider: str,
+        instance_type: str,
+        region: str,
+        bandwidth_gb: float,
+        storage_gb: float,
+        hours_per_month: float,
+    ) -> _MonthlyCost:
+        """Compute the cost components behind estimate_monthly_cost"""
+
+        rates = cls._rates.get(provider)
+        if rates is None:
+            raise ValueError(f"Unknown provider: {provider}")
 
         # Get base instance cost
-        if instance_type not in provider_pricing["instances"]:
+        instance_hourly = rates.instances.get(instance_type)
+        if instance_hourly is None:
             raise ValueError(f"Unknown instance type: {instance_type}")
 
-        instance_hourly = provider_pricing["instances"][instance_type]
-
         # Apply regional pricing modifier
-        region_modifier = provider_pricing["regions"].get(region, 1.0)
-        instance_hourly *= region_modifier
+        instance_hourly *= rates.regions.get(region, 1.0)
 
         # Calculate costs
         instance_cost = instance_hourly * hours_per_month
 
         # IP address cost
-        ip_cost = provider_pricing["ip"] * hours_per_month
+        ip_cost = rates.ip * hours_per_month
 
         # Bandwidth cost (tiered pricing)
-        bandwidth_cost = self.calculate_bandwidth_cost(provider, bandwidth_gb)
+        bandwidth_cost = cls.calculate_bandwidth_cost(provider, bandwidth_gb)
 
         # Storage cost
-        storage_type = list(provider_pricing["storage"].keys())[0]
-        storage_cost = provider_pricing["storage"][storage_type] * storage_gb
+        storage_cost = rates.storage * storage_gb
 
         # Total cost
         total_cost = instance_cost + ip_cost + bandwidth_cost + storage_cost
 
-        return {
-            "provider": provider,
-            "region": region,
-            "instance_type": instance_type,
-            "breakdown": {
-                "instance": round(instance_cost, 2),
-                "ip_address": round(ip_cost, 2),
-                "bandwidth": round(bandwidth_cost, 2),
-                "storage": round(storage_cost, 2),
-            },
-            "total_monthly": round(total_cost, 2),
-            "total_yearly": round(total_cost * 12, 2),
-            "currency": "USD",
-            "estimated_at": datetime.now().isoformat(),
-        }
+        return _MonthlyCost(instance_cost, ip_cost, bandwidth_cost, storage_cost, total_cost)
 
-    def calculate_bandwidth_cost(self, provider: str, bandwidth_gb: float) -> float:
+    def _compute_monthly_cost_batch(
+        self,
+        provider: str,
+        instance_type: str,
+        region: str,
+        usage: List[Tuple[float, float]],
+        hours_per_month: float,
+    ) -> List[_MonthlyCost]:
+        """Compute costs for usage variants of one configuration
+
+        Instance and IP cost do not depend on usage, so they are computed
+        (and validated) once for the whole batch.
+        """
+        fixed = self._compute_monthly_cost(provider, instance_type, region, 0, 0, hours_per_month)
+        storage_rate = self._rates[provider].storage
+
+        costs = []
+        for bandwidth_gb, storage_gb in usage:
+            bandwidth_cost = self.calculate_bandwidth_cost(provider, bandwidth_gb)
+            storage_cost = storage_rate * storage_gb
+            total_cost = fixed.instance + fixed.ip_address + bandwidth_cost + storage_cost
+            costs.append(
+                _MonthlyCost(fixed.instance, fixed.ip_address, bandwidth_cost, storage_cost, total_cost)
+            )
+        return costs
+
+    @classmethod
+    def _build_bandwidth_tables(cls) -> Dict[str, Tuple[List[float], List[float], List[float]]]:
+        """Build (thresholds, cumulative costs, marginal rates) per provider"""
+        tables = {}
+        for provider, tiers in cls.BANDWIDTH_TIERS.items():
+            bandwidth_pricing = _PRICING[provider]["bandwidth"]
+            scale = cls.BANDWIDTH_RATE_SCALE.get(provider, 1.0)
+            thresholds, cumulative, marginals = [0.0], [0.0], []
+            for key, width in tiers:
+                rate = bandwidth_pricing[key] * scale
+                marginals.append(rate)
+                if width is not None:
+                    thresholds.append(thresholds[-1] + width)
+                    cumulative.append(cumulative[-1] + width * rate)
+            tables[provider] = (thresholds, cumulative, marginals)
+        return tables
+
+    @classmethod
+    def calculate_bandwidth_cost(cls, provider: str, bandwidth_gb: float) -> float:
         """Calculate bandwidth cost with tiered pricing"""
-        bandwidth_pricing = self.pricing[provider]["bandwidth"]
-        cost = 0.0
-
-        if provider == "aws":
-            if bandwidth_gb <= 10240:  # First 10TB
-                cost = bandwidth_gb * bandwidth_pricing["first_10tb"]
-            elif bandwidth_gb <= 51200:  # Next 40TB
-                cost = 10240 * bandwidth_pricing["first_10tb"]
-                cost += (bandwidth_gb - 10240) * bandwidth_pricing["next_40tb"]
-            elif bandwidth_gb <= 153600:  # Next 100TB
-                cost = 10240 * bandwidth_pricing["first_10tb"]
-                cost += 40960 * bandwidth_pricing["next_40tb"]
-                cost += (bandwidth_gb - 51200) * bandwidth_pricing["next_100tb"]
-            else:  # Over 150TB
-                cost = 10240 * bandwidth_pricing["first_10tb"]
-                cost += 40960 * bandwidth_pricing["next_40tb"]
-                cost += 102400 * bandwidth_pricing["next_100tb"]
-                cost += (bandwidth_gb - 153600) * bandwidth_pricing["over_150tb"]
-
-        elif provider == "azure":
-            if bandwidth_gb <= 5:  # First 5GB free
-                cost = 0
-            elif bandwidth_gb <= 10245:  # Next 10TB
-                cost = (bandwidth_gb - 5) * bandwidth_pricing["next_10tb"]
-            elif bandwidth_gb <= 51205:  # Next 40TB
-                cost = 10240 * bandwidth_pricing["next_10tb"]
-                cost += (bandwidth_gb - 10245) * bandwidth_pricing["next_40tb"]
-            # Similar tiered calculation
-
-        elif provider == "digitalocean":
-            if bandwidth_gb <= 1000:  # First 1TB free
-                cost = 0
-            else:
-                cost = (bandwidth_gb - 1000) * bandwidth_pricing["over_1000gb"]
-        
-        elif provider == "hetzner":
-            if bandwidth_gb <= 20480:  # First 20TB free
-                cost = 0
-            else:
-                # Convert to TB and charge per TB over 20TB
-                cost = ((bandwidth_gb - 20480) / 1024) * 1000 * bandwidth_pricing["over_20tb"]
+        if provider == "aws" and bandwidth_gb <= 10240:
+            return bandwidth_gb * cls._aws_first_tier_rate
 
-        return cost
+        thresholds, cumulative, marginals = cls._bw_tables[provider]
+        tier = max(bisect_right(thresholds, bandwidth_gb) - 1, 0)
+        return cumulative[tier] + (bandwidth_gb - thresholds[tier]) * marginals[tier]
 
     def compare_providers(
         self, regions: Dict[str, str], bandwidth_gb: float = 100, storage_gb: float = 20
@@ -255,28 +437,15 @@ class CostEstimator:
         """Compare costs across different providers and regions"""
         comparisons = []
 
-        for provider in ["aws", "azure", "digitalocean", "hetzner"]:
-            # Get default instance type for provider
-            if provider == "aws":
-                instance_type = "t3.micro"
-                region = regions.get("aws", "us-east-1")
-            elif provider == "azure":
-                instance_type = "Standard_B1s"
-                region = regions.get("azure", "eastus")
-            elif provider == "digitalocean":
-                instance_type = "s-1vcpu-1gb"
-                region = regions.get("digitalocean", "nyc1")
-            else:  # hetzner
-                instance_type = "cx11"
-                region = regions.get("hetzner", "fsn1")
-
-            try:
-                estimate = self.estimate_monthly_cost(
-                    provider, instance_type, region, bandwidth_gb, storage_gb
-                )
-                comparisons.append(estimate)
-            except Exception as e:
-                print(f"Error estimating {provider}: {e}")
+        for provider, instance_type in DEFAULT_INSTANCE.items():
+            region = regions.get(provider, DEFAULT_REGION[provider])
+
+            # Default instance types are always priced and unknown regions
+            # fall back to the baseline modifier, so this cannot raise
+            estimate = self.estimate_monthly_cost(
+                provider, instance_type, region, bandwidth_gb, storage_gb
+            )
+            comparisons.append(estimate)
 
         # Sort by total cost
         comparisons.sort(key=lambda x: x["total_monthly"])
@@ -396,45 +565,23 @@ class CostEstimator:
 
     def get_smaller_instances(self, provider: str, current: str) -> List[str]:
         """Get list of smaller instance types"""
-        instances = list(self.pricing[provider]["instances"].keys())
+        prices, names = self._sorted_instances[provider]
         current_price = self.pricing[provider]["instances"][current]
 
-        smaller = [
-            i
-            for i in instances
-            if self.pricing[provider]["instances"][i] < current_price
-        ]
-
-        # Sort by price descending (largest of the smaller instances first)
-        smaller.sort(key=lambda x: self.pricing[provider]["instances"][x], reverse=True)
-
-        return smaller
+        # Largest of the smaller instances first
+        return names[:bisect_left(prices, current_price)][::-1]
 
     def get_larger_instances(self, provider: str, current: str) -> List[str]:
         """Get list of larger instance types"""
-        instances = list(self.pricing[provider]["instances"].keys())
+        prices, names = self._sorted_instances[provider]
         current_price = self.pricing[provider]["instances"][current]
 
-        larger = [
-            i
-            for i in instances
-            if self.pricing[provider]["instances"][i] > current_price
-        ]
-
-        # Sort by price ascending (smallest of the larger instances first)
-        larger.sort(key=lambda x: self.pricing[provider]["instances"][x])
-
-        return larger
+        # Smallest of the larger instances first
+        return names[bisect_right(prices, current_price):]
 
     def get_arm_equivalent(self, instance_type: str) -> Optional[str]:
         """Get ARM equivalent of x86 instance"""
-        arm_map = {
-            "t3.micro": "t4g.micro",
-            "t3.small": "t4g.small",
-            "t3.medium": "t4g.medium",
-        }
-
-        return arm_map.get(instance_type)
+        return self.ARM_EQUIVALENTS.get(instance_type)
 
     def generate_cost_report(
         self, deployments: List[Dict], period_days: int = 30
@@ -442,7 +589,7 @@ class CostEstimator:
         """Generate comprehensive cost report"""
         report = {
             "period_days": period_days,
-            "generated_at": datetime.now().isoformat(),
+            "generated_at": _timestamp(),
             "deployments": [],
             "total_cost": 0,
             "cost_by_provider": {},
@@ -450,38 +597,33 @@ class CostEstimator:
             "recommendations": [],
         }
 
+        total_cost = 0
+        by_provider = defaultdict(float)
+        by_region = defaultdict(float)
+
         for deployment in deployments:
-            estimate = self.estimate_monthly_cost(
+            config = (
                 deployment["provider"],
                 deployment["instance_type"],
                 deployment["region"],
                 deployment.get("bandwidth_gb", 100),
                 deployment.get("storage_gb", 20),
             )
+            report["deployments"].append(self.estimate_monthly_cost(*config))
 
-            report["deployments"].append(estimate)
-            report["total_cost"] += estimate["total_monthly"]
+            # Aggregate the unrounded cost (a cache hit after the estimate)
+            # so per-deployment rounding does not accumulate in the totals
+            monthly = self._compute_monthly_cost(*config, 730).total
+            total_cost += monthly
 
-            # Aggregate by provider
-            provider = deployment["provider"]
-            if provider not in report["cost_by_provider"]:
-                report["cost_by_provider"][provider] = 0
-            report["cost_by_provider"][provider] += estimate["total_monthly"]
-
-            # Aggregate by region
-            region = deployment["region"]
-            if region not in report["cost_by_region"]:
-                report["cost_by_region"][region] = 0
-            report["cost_by_region"][region] += estimate["total_monthly"]
+            # Aggregate by provider and region
+            by_provider[deployment["provider"]] += monthly
+            by_region[deployment["region"]] += monthly
 
         # Round totals
-        report["total_cost"] = round(report["total_cost"], 2)
-        report["cost_by_provider"] = {
-            k: round(v, 2) for k, v in report["cost_by_provider"].items()
-        }
-        report["cost_by_region"] = {
-            k: round(v, 2) for k, v in report["cost_by_region"].items()
-        }
+        report["total_cost"] = round(total_cost, 2)
+        report["cost_by_provider"] = {k: round(v, 2) for k, v in by_provider.items()}
+        report["cost_by_region"] = {k: round(v, 2) for k, v in by_region.items()}
 
         # Add savings opportunities
         if report["total_cost"] > 100:
@@ -522,40 +664,39 @@ class CostEstimator:
         
         # Auto-detect instance type if not provided
         if not instance_type:
-            if provider == "aws":
-                instance_type = "t3.micro"
-            elif provider == "azure":
-                instance_type = "Standard_B1s"
-            elif provider == "digitalocean":
-                instance_type = "s-1vcpu-1gb"
-            elif provider == "hetzner":
-                instance_type = "cx11"
+            instance_type = DEFAULT_INSTANCE.get(provider)
+        
+        # Base deployment, scaling scenarios and multi-client scaling differ
+        # only in usage, so cost them in one batch
+        client_counts = [5, 10, 25, 50]
+        usage = [
+            (bandwidth_gb_per_month, storage_gb),
+            (bandwidth_gb_per_month * 0.5, storage_gb),
+            (bandwidth_gb_per_month * 3, storage_gb * 2),
+        ]
+        for clients in client_counts:
+            scaled_bandwidth = bandwidth_gb_per_month * (clients / expected_clients)
+            scaled_storage = storage_gb + (clients * 0.1)  # Small per-client overhead
+            usage.append((scaled_bandwidth, scaled_storage))
+        
+        costs = self._compute_monthly_cost_batch(provider, instance_type, region, usage, 730)
+        estimates = [self._estimate(provider, instance_type, region, cost) for cost in costs]
         
         # Calculate base deployment cost
-        base_cost = self.estimate_monthly_cost(
-            provider, instance_type, region, bandwidth_gb_per_month, storage_gb
-        )
+        base_cost = estimates[0]
         
         # Calculate scaling scenarios
         scenarios = {
             "current": base_cost,
-            "light_usage": self.estimate_monthly_cost(
-                provider, instance_type, region, bandwidth_gb_per_month * 0.5, storage_gb
-            ),
-            "heavy_usage": self.estimate_monthly_cost(
-                provider, instance_type, region, bandwidth_gb_per_month * 3, storage_gb * 2
-            )
+            "light_usage": estimates[1],
+            "heavy_usage": estimates[2]
         }
         
         # Calculate multi-client scaling
-        client_scaling = {}
-        for clients in [5, 10, 25, 50]:
-            scaled_bandwidth = bandwidth_gb_per_month * (clients / expected_clients)
-            scaled_storage = storage_gb + (clients * 0.1)  # Small per-client overhead
-            
-            client_scaling[f"{clients}_clients"] = self.estimate_monthly_cost(
-                provider, instance_type, region, scaled_bandwidth, scaled_storage
-            )
+        client_scaling = {
+            f"{clients}_clients": estimate
+            for clients, estimate in zip(client_counts, estimates[3:])
+        }
         
         # Provider comparison
         comparison = self.compare_providers(
@@ -563,11 +704,13 @@ class CostEstimator:
         )
         
         # Cost projections
+        # Scale the unrounded monthly total so cents are not multiplied up
+        base_monthly = costs[0].total
         projections = {
             "monthly": base_cost["total_monthly"],
-            "quarterly": base_cost["total_monthly"] * 3,
-            "yearly": base_cost["total_monthly"] * 12,
-            "custom_duration": base_cost["total_monthly"] * duration_months
+            "quarterly": round(base_monthly * 3, 2),
+            "yearly": round(base_monthly * 12, 2),
+            "custom_duration": round(base_monthly * duration_months, 2)
         }
         
         # Budget warnings and recommendations
@@ -610,10 +753,11 @@ class CostEstimator:
             })
         
         # Regional cost comparison
-        comparison_dict = {item["provider"]: item for item in comparison}
-        if len(comparison_dict) > 1:
-            cheapest = min(comparison, key=lambda x: x["total_monthly"])
-            current = next((item for item in comparison if item["provider"] == provider), base_cost)
+        by_provider = {item["provider"]: item for item in comparison}
+        if len(by_provider) > 1:
+            # compare_providers returns estimates sorted by monthly cost
+            cheapest = comparison[0]
+            current = by_provider.get(provider, base_cost)
             if cheapest["total_monthly"] < current["total_monthly"]:
                 savings = current["total_monthly"] - cheapest["total_monthly"]
                 recommendations.append({
@@ -645,7 +789,7 @@ class CostEstimator:
                 "break_even_clients": max(1, int(50 / (base_cost["total_monthly"] / expected_clients))),
                 "risk_level": "high" if base_cost["total_monthly"] > 100 else "medium" if base_cost["total_monthly"] > 30 else "low"
             },
-            "generated_at": datetime.now().isoformat()
+            "generated_at": _timestamp()
         }
 
     def cost_comparison_matrix(self, regions_config: Dict[str, str], scenarios: Dict[str, Dict]) -> Dict:
@@ -657,18 +801,21 @@ class CostEstimator:
             matrix[scenario_name] = {}
             
             for provider, region in regions_config.items():
+                # Only the totals and breakdown are reported, so skip building
+                # a full estimate dict for every cell
                 try:
-                    cost = self.estimate_monthly_cost(
-                        provider=provider,
-                        instance_type=scenario_config.get("instance_type", "t3.micro"),
-                        region=region,
-                        bandwidth_gb=scenario_config.get("bandwidth_gb", 100),
-                        storage_gb=scenario_config.get("storage_gb", 20)
+                    cost = self._compute_monthly_cost(
+                        provider,
+                        scenario_config.get("instance_type", "t3.micro"),
+                        region,
+                        scenario_config.get("bandwidth_gb", 100),
+                        scenario_config.get("storage_gb", 20),
+                        730,
                     )
                     matrix[scenario_name][provider] = {
                         "region": region,
-                        "monthly_cost": cost["total_monthly"],
-                        "breakdown": cost["breakdown"]
+                        "monthly_cost": round(cost.total, 2),
+                        "breakdown": self._breakdown(cost)
                     }
                 except Exception:
                     matrix[scenario_name][provider] = {
@@ -690,27 +837,35 @@ class CostEstimator:
         # Find optimal configuration within budget
         configurations = []
         
-        # Test different instance types
-        instance_types = list(self.pricing[provider]["instances"].keys())
+        # Test different instance types. Only the instance price varies
+        # between them, so walk them cheapest first and stop at the first
+        # one over budget
+        prices, instance_types = self._sorted_instances[provider]
+        total_bandwidth = clients * bandwidth_per_client
         
-        for instance_type in instance_types:
-            total_bandwidth = clients * bandwidth_per_client
+        # IP, bandwidth and storage cost are the same for every instance
+        # type, so compute them once and vary only the instance cost
+        shared = self._compute_monthly_cost(
+            provider, instance_types[0], region, total_bandwidth, 20, 730
+        )
+        region_modifier = self._rates[provider].regions.get(region, 1.0)
+        
+        for price, instance_type in zip(prices, instance_types):
+            instance_cost = price * region_modifier * 730
+            total_cost = instance_cost + shared.ip_address + shared.bandwidth + shared.storage
+            monthly_cost = round(total_cost, 2)
             
-            try:
-                cost = self.estimate_monthly_cost(
-                    provider, instance_type, region, total_bandwidth, 20
-                )
-                
-                if cost["total_monthly"] <= monthly_budget:
-                    configurations.append({
-                        "instance_type": instance_type,
-                        "monthly_cost": cost["total_monthly"],
-                        "budget_utilization": cost["total_monthly"] / monthly_budget,
-                        "max_clients": int(clients * (monthly_budget / cost["total_monthly"])),
-                        "cost_breakdown": cost["breakdown"]
-                    })
-            except Exception:
-                continue
+            if monthly_cost > monthly_budget:
+                break
+            
+            cost = shared._replace(instance=instance_cost, total=total_cost)
+            configurations.append({
+                "instance_type": instance_type,
+                "monthly_cost": monthly_cost,
+                "budget_utilization": monthly_cost / monthly_budget,
+                "max_clients": int(clients * (monthly_budget / monthly_cost)),
+                "cost_breakdown": self._breakdown(cost)
+            })
         
         # Sort by budget utilization (best value)
         configurations.sort(key=lambda x: x["budget_utilization"], reverse=True)
@@ -725,3 +880,6 @@ class CostEstimator:
                 [c["monthly_cost"] for c in configurations], default=None
             ) if not configurations else None
         }
+
+
+CostEstimator._build_pricing_tables()
@@ -4,63 +4,313 @@ Deployment Tracker for ProxyGen
 Tracks all deployed resources and allows selective management
 """
 
+import io
 import json
 import os
-from datetime import datetime
+import shutil
+from collections import defaultdict
+from datetime import datetime, timedelta
+from functools import lru_cache
 from pathlib import Path
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, Tuple, IO, Iterator
 import logging
 try:
     from .ip_manager import IPManager
 except ImportError:
     from ip_manager import IPManager
 
+try:
+    import orjson
+
+    _loads = orjson.loads
+
+    def _dumps_inventory(obj) -> bytes:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2, default=str)
+
+except ImportError:  # orjson is optional; fall back to the stdlib codec
+    _loads = json.loads
+
+    def _dumps_inventory(obj) -> bytes:
+        return json.dumps(obj, indent=2, default=str).encode()
+
 logger = logging.getLogger(__name__)
 
+# Detailed instance type pricing (USD per month)
+_INSTANCE_PRICING = {
+    "aws": {
+        "t3.nano": 3.80,
+        "t3.micro": 7.60,
+        "t3.small": 15.20,
+        "t3.medium": 30.40,
+        "t3.large": 60.80,
+        "t2.micro": 8.50,  # Legacy, in free tier
+        "t2.small": 16.80,
+        "t2.medium": 33.70,
+    },
+    "azure": {
+        "Standard_B1s": 3.80,
+        "Standard_B1ms": 7.60,
+        "Standard_B2s": 15.20,
+        "Standard_B2ms": 30.40,
+        "Standard_B4ms": 60.80,
+        "Standard_D2s_v3": 70.00,
+    },
+    "digitalocean": {
+        "s-1vcpu-1gb": 6.00,
+        "s-1vcpu-2gb": 12.00,
+        "s-2vcpu-2gb": 18.00,
+        "s-2vcpu-4gb": 24.00,
+        "s-4vcpu-8gb": 48.00,
+    },
+    "hetzner": {
+        "cx11": 3.60,
+        "cx21": 6.40,
+        "cx31": 11.60,
+        "cx41": 22.00,
+        "cx51": 43.00,
+    }
+}
+
+# Additional costs
+_ADDITIONAL_COSTS = {
+    "aws": {"ip": 3.60, "storage_per_gb": 0.10},
+    "azure": {"ip": 3.60, "storage_per_gb": 0.115},
+    "digitalocean": {"ip": 0, "storage_per_gb": 0.10},
+    "hetzner": {"ip": 0, "storage_per_gb": 0.05},
+}
+
+# Cheapest instance per provider, used for unrecognised instance types
+_CHEAPEST_INSTANCE = {
+    provider: min(prices.values()) for provider, prices in _INSTANCE_PRICING.items()
+}
+
+# Default costs if no instance type specified
+_DEFAULT_COSTS = {"aws": 7.60, "azure": 7.60, "digitalocean": 6.00, "hetzner": 3.60}
+
+
+@lru_cache(maxsize=256)
+def _estimate_cost_totals(
+    provider: str, instance_type: Optional[str], has_public_ip: bool, storage_gb: float
+) -> Tuple[float, float, float]:
+    """Return rounded (monthly, yearly, daily) cost for a deployment shape"""
+    # Calculate instance cost
+    monthly_cost = 0
+    if instance_type and provider in _INSTANCE_PRICING:
+        if instance_type in _INSTANCE_PRICING[provider]:
+            monthly_cost = _INSTANCE_PRICING[provider][instance_type]
+        else:
+            # Default to cheapest if instance type not found
+            monthly_cost = _CHEAPEST_INSTANCE[provider]
+    else:
+        # Default costs if no instance type specified
+        monthly_cost = _DEFAULT_COSTS.get(provider, 10.00)
+
+    # Add IP cost if public IP exists
+    if has_public_ip:
+        monthly_cost += _ADDITIONAL_COSTS.get(provider, {}).get("ip", 3.60)
+
+    # Add storage cost (default 20GB)
+    storage_cost = storage_gb * _ADDITIONAL_COSTS.get(provider, {}).get("storage_per_gb", 0.10)
+    monthly_cost += storage_cost
+
+    return (
+        round(monthly_cost, 2),
+        round(monthly_cost * 12, 2),
+        round(monthly_cost / 30, 2),
+    )
+
+
+@lru_cache(maxsize=4096)
+def _iso_timestamp(value: str) -> float:
+    """Parse an ISO 8601 timestamp to epoch seconds, caching repeat values"""
+    return datetime.fromisoformat(value).timestamp()
+
 
 class DeploymentTracker:
     """Track and manage all Proxy deployments"""
 
+    # Journal entries appended before the inventory is snapshotted and the
+    # journal truncated
+    JOURNAL_COMPACT_AT = 1000
+
     def __init__(self, base_dir: Path):
         self.base_dir = base_dir
         self.state_dir = base_dir / "state"
         self.inventory_file = self.state_dir / "deployment_inventory.json"
+        self.journal_file = self.state_dir / "deployments.jsonl"
         self.ip_manager = IPManager(base_dir)
+        self._journal = None
+        self._journal_entries = 0
+        self._records = None
         self.load_inventory()
 
     def load_inventory(self):
         """Load deployment inventory from file"""
         if self.inventory_file.exists():
             try:
-                with open(self.inventory_file, "r") as f:
-                    self.inventory = json.load(f)
+                self.inventory = _loads(self.inventory_file.read_bytes())
             except json.JSONDecodeError:
                 logger.warning("Corrupted inventory file, creating new one")
                 self.inventory = {"deployments": {}, "metadata": {}}
         else:
+            now = datetime.now().isoformat()
             self.inventory = {
                 "deployments": {},
                 "metadata": {
-                    "created_at": datetime.now().isoformat(),
-                    "last_updated": datetime.now().isoformat(),
+                    "created_at": now,
+                    "last_updated": now,
                     "version": "1.0",
                 },
             }
-            self.save_inventory()
-
-    def save_inventory(self):
-        """Save deployment inventory to file"""
-        self.inventory["metadata"]["last_updated"] = datetime.now().isoformat()
-
-        # Create backup of existing inventory
-        if self.inventory_file.exists():
-            backup_file = self.inventory_file.with_suffix(".json.backup")
-            import shutil
+            self.save_inventory(skip_timestamp=True)
+
+        self._rebuild_index()
+        self._replay_journal()
+
+    def _replay_journal(self):
+        """Apply journaled changes made since the inventory snapshot"""
+        self._journal_entries = 0
+        if not self.journal_file.exists():
+            return
+
+        snapshot_seq = self.inventory["metadata"].get("journal_seq", 0)
+        good_end = 0
+        with open(self.journal_file, "rb") as f:
+            for line in f:
+                try:
+                    # A write cut short by a crash can only be the last line,
+                    # and may have lost just its newline
+                    if not line.endswith(b"\n"):
+                        raise ValueError("missing newline")
+                    entry = _loads(line)
+                except ValueError:
+                    logger.warning("Discarding truncated deployment journal entry")
+                    break
+                good_end += len(line)
+                if entry["seq"] > snapshot_seq:
+                    self._apply(entry)
+                    self._journal_entries += 1
+
+        # Cut the torn tail off, or the next entry would be appended to it
+        # and every later load would stop at the same spot
+        if good_end < self.journal_file.stat().st_size:
+            os.truncate(self.journal_file, good_end)
+
+    def _apply(self, entry: Dict):
+        """Apply one journal entry to the in-memory inventory"""
+        if entry["op"] == "add":
+            self._insert(entry["deployment"])
+        else:
+            deployment = self.get_deployment(entry["id"])
+            if deployment is not None:
+                if entry["op"] == "update":
+                    deployment.update(entry["fields"])
+                    if self._records is not None and "status" in entry["fields"]:
+                        self._status[self._row[entry["id"]]] = deployment.get("status")
+                elif entry["op"] == "client":
+                    deployment.setdefault("clients", []).append(entry["client"])
+
+        self.inventory["metadata"]["journal_seq"] = entry["seq"]
+        self.inventory["metadata"]["last_updated"] = entry["at"]
+
+    def _commit(self, entry: Dict, now: str):
+        """Apply a change and append it to the journal
+
+        now is the caller's timestamp for the change, so the record fields
+        and metadata.last_updated agree. The full inventory is only
+        rewritten once JOURNAL_COMPACT_AT entries have accumulated, instead
+        of on every change.
+        """
+        entry["seq"] = self.inventory["metadata"].get("journal_seq", 0) + 1
+        entry["at"] = now
+        self._apply(entry)
+
+        if self._journal is None:
+            self._journal = open(self.journal_file, "a", buffering=1 << 16)
+        self._journal.write(json.dumps(entry, default=str) + "\n")
+        self._journal.flush()
+
+        self._journal_entries += 1
+        if self._journal_entries >= self.JOURNAL_COMPACT_AT:
+            self.save_inventory(skip_timestamp=True)
+
+    def _rebuild_index(self):
+        """Map each deployment ID to its (provider, region, position) in the inventory"""
+        self._id_index = {}
+        # Positions have moved, so the flat columns are rebuilt on next read
+        self._records = None
+        for provider, regions in self.inventory["deployments"].items():
+            for region, deployments in regions.items():
+                for i, deployment in enumerate(deployments):
+                    # First match in tree order wins, as a full scan would
+                    self._id_index.setdefault(deployment["id"], (provider, region, i))
+
+    def _rebuild_columns(self):
+        """Flatten the inventory, in tree order, into per-field columns
+
+        Report and listing scans read these parallel lists rather than
+        walking the nested provider/region structure record by record.
+        """
+        self._records = []
+        self._status = []
+        self._provider = []
+        self._monthly_cost = []
+        self._row = {}
+        for regions in self.inventory["deployments"].values():
+            for deployments in regions.values():
+                for deployment in deployments:
+                    self._row.setdefault(deployment["id"], len(self._records))
+                    self._append_columns(deployment)
+
+    def _append_columns(self, deployment: Dict):
+        """Add one deployment record to the flat columns"""
+        self._records.append(deployment)
+        self._status.append(deployment.get("status"))
+        self._provider.append(deployment["provider"])
+        self._monthly_cost.append(deployment.get("cost_estimate", {}).get("monthly", 0))
+
+    def save_inventory(self, skip_timestamp: bool = False):
+        """Save deployment inventory to file
+
+        skip_timestamp leaves metadata.last_updated alone for callers that
+        have already stamped it.
+        """
+        if not skip_timestamp:
+            self.inventory["metadata"]["last_updated"] = datetime.now().isoformat()
+
+        # Write a sibling temp file and rename it over the inventory, so a
+        # crash mid-write never leaves a truncated inventory behind
+        tmp_file = self.inventory_file.with_suffix(".json.tmp")
+        with open(tmp_file, "wb", buffering=1 << 16) as f:
+            f.write(_dumps_inventory(self.inventory))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_file, self.inventory_file)
+
+        # Everything journaled so far is now in the snapshot
+        if self._journal is not None:
+            self._journal.close()
+            self._journal = None
+        if self.journal_file.exists():
+            self.journal_file.write_text("")
+        self._journal_entries = 0
+
+    def checkpoint(self, keep: int = 3):
+        """Save the inventory and keep a rolling set of numbered backups
+
+        deployment_inventory.json.1 is the newest backup and
+        deployment_inventory.json.<keep> the oldest. Call this before a
+        destructive change so the newest backup holds the state it replaces.
+        """
+        self.save_inventory()
 
-            shutil.copy2(self.inventory_file, backup_file)
+        for n in range(keep - 1, 0, -1):
+            backup_file = self.inventory_file.with_suffix(f".json.{n}")
+            if backup_file.exists():
+                os.replace(backup_file, self.inventory_file.with_suffix(f".json.{n + 1}"))
 
-        with open(self.inventory_file, "w") as f:
-            json.dump(self.inventory, f, indent=2, default=str)
+        if keep > 0:
+            shutil.copy2(self.inventory_file, self.inventory_file.with_suffix(".json.1"))
 
     def add_deployment(
         self,
@@ -71,12 +321,12 @@ class DeploymentTracker:
         config: Optional[Dict] = None,
     ) -> str:
         """Add a new deployment to inventory"""
+        now = datetime.now()
+        now_iso = now.isoformat()
 
         # Create unique deployment ID if not provided
         if not deployment_id:
-            deployment_id = (
-                f"{provider}-{region}-{datetime.now().strftime('%Y%m%d-%H%M%S')}"
-            )
+            deployment_id = f"{provider}-{region}-{now.strftime('%Y%m%d-%H%M%S')}"
 
         # Check for IP conflicts before creating deployment
         existing_ips = self.ip_manager.check_ip_conflicts(provider, region)
@@ -87,7 +337,7 @@ class DeploymentTracker:
             "id": deployment_id,
             "provider": provider,
             "region": region,
-            "created_at": datetime.now().isoformat(),
+            "created_at": now_iso,
             "status": "active",
             "resources": resources,
             "config": config or {},
@@ -103,27 +353,48 @@ class DeploymentTracker:
             )
 
         # Store in inventory
+        self._commit({"op": "add", "deployment": deployment_record}, now_iso)
+        logger.info(f"Added deployment {deployment_id} to inventory")
+
+        return deployment_id
+
+    def _insert(self, deployment_record: Dict):
+        """Store a deployment record under its provider and region"""
+        deployment_id = deployment_record["id"]
+        provider = deployment_record["provider"]
+        region = deployment_record["region"]
+
         if provider not in self.inventory["deployments"]:
             self.inventory["deployments"][provider] = {}
 
         if region not in self.inventory["deployments"][provider]:
             self.inventory["deployments"][provider][region] = []
 
-        self.inventory["deployments"][provider][region].append(deployment_record)
-
-        self.save_inventory()
-        logger.info(f"Added deployment {deployment_id} to inventory")
-
-        return deployment_id
+        region_deployments = self.inventory["deployments"][provider][region]
+        region_deployments.append(deployment_record)
+        if deployment_id in self._id_index:
+            # Duplicate ID: recompute which record a lookup resolves to
+            self._rebuild_index()
+        else:
+            self._id_index[deployment_id] = (provider, region, len(region_deployments) - 1)
+
+        if self._records is not None:
+            deployments = self.inventory["deployments"]
+            if (next(reversed(deployments)) == provider
+                    and next(reversed(deployments[provider])) == region):
+                # Record is last in tree order, so the columns extend in place
+                self._row.setdefault(deployment_id, len(self._records))
+                self._append_columns(deployment_record)
+            else:
+                self._records = None
 
     def get_deployment(self, deployment_id: str) -> Optional[Dict]:
         """Get a specific deployment by ID"""
-        for provider in self.inventory["deployments"]:
-            for region in self.inventory["deployments"][provider]:
-                for deployment in self.inventory["deployments"][provider][region]:
-                    if deployment["id"] == deployment_id:
-                        return deployment
-        return None
+        location = self._id_index.get(deployment_id)
+        if location is None:
+            return None
+        provider, region, i = location
+        return self.inventory["deployments"][provider][region][i]
 
     def get_deployments_by_region(self, provider: str, region: str) -> List[Dict]:
         """Get all deployments in a specific region"""
@@ -134,19 +405,24 @@ class DeploymentTracker:
 
     def list_all_deployments(self) -> List[Dict]:
         """List all deployments across all providers and regions"""
-        deployments = []
-        for provider in self.inventory["deployments"]:
-            for region in self.inventory["deployments"][provider]:
-                deployments.extend(self.inventory["deployments"][provider][region])
-        return deployments
+        return list(self._iter_all_deployments())
+
+    def _iter_all_deployments(self) -> Iterator[Dict]:
+        """Yield every deployment in provider/region order"""
+        for regions in self.inventory["deployments"].values():
+            for deployments in regions.values():
+                yield from deployments
 
     def update_deployment_status(self, deployment_id: str, status: str):
         """Update the status of a deployment"""
         deployment = self.get_deployment(deployment_id)
         if deployment:
-            deployment["status"] = status
-            deployment["last_modified"] = datetime.now().isoformat()
-            self.save_inventory()
+            now = datetime.now().isoformat()
+            self._commit({
+                "op": "update",
+                "id": deployment_id,
+                "fields": {"status": status, "last_modified": now},
+            }, now)
             return True
         return False
 
@@ -154,202 +430,137 @@ class DeploymentTracker:
         """Add a client configuration to a deployment"""
         deployment = self.get_deployment(deployment_id)
         if deployment:
-            if "clients" not in deployment:
-                deployment["clients"] = []
-
+            now = datetime.now().isoformat()
             client_record = {
                 "name": client_info.get("name"),
                 "ip_address": client_info.get("ip_address"),
-                "created_at": datetime.now().isoformat(),
+                "created_at": now,
                 "config_file": client_info.get("config_file"),
                 "active": True,
             }
 
-            deployment["clients"].append(client_record)
-            self.save_inventory()
+            self._commit({"op": "client", "id": deployment_id, "client": client_record}, now)
             return True
         return False
 
     def remove_deployment(self, deployment_id: str) -> bool:
         """Remove a deployment from inventory"""
-        for provider in self.inventory["deployments"]:
-            for region in self.inventory["deployments"][provider]:
-                deployments = self.inventory["deployments"][provider][region]
-                for i, deployment in enumerate(deployments):
-                    if deployment["id"] == deployment_id:
-                        # Release IP address before marking as destroyed
-                        self.ip_manager.release_deployment_ip(deployment_id)
-                        
-                        # Mark as destroyed instead of removing
-                        deployment["status"] = "destroyed"
-                        deployment["destroyed_at"] = datetime.now().isoformat()
-                        self.save_inventory()
-                        logger.info(f"Marked deployment {deployment_id} as destroyed")
-                        return True
-        return False
+        deployment = self.get_deployment(deployment_id)
+        if deployment is None:
+            return False
+
+        # Release IP address before marking as destroyed
+        self.ip_manager.release_deployment_ip(deployment_id)
+
+        # Mark as destroyed instead of removing; the record stays indexed
+        now = datetime.now().isoformat()
+        self._commit({
+            "op": "update",
+            "id": deployment_id,
+            "fields": {"status": "destroyed", "destroyed_at": now},
+        }, now)
+        logger.info(f"Marked deployment {deployment_id} as destroyed")
+        return True
 
     def get_active_deployments(self) -> List[Dict]:
         """Get all active deployments"""
-        active = []
-        for deployment in self.list_all_deployments():
-            if deployment.get("status") == "active":
-                active.append(deployment)
-        return active
+        if self._records is None:
+            self._rebuild_columns()
+        return [
+            deployment
+            for deployment, status in zip(self._records, self._status)
+            if status == "active"
+        ]
 
     def _estimate_cost(self, provider: str, resources: Dict, config: Dict = None) -> Dict:
         """Estimate monthly cost for resources based on actual instance types"""
         
-        # Detailed instance type pricing (USD per month)
-        instance_pricing = {
-            "aws": {
-                "t3.nano": 3.80,
-                "t3.micro": 7.60,
-                "t3.small": 15.20,
-                "t3.medium": 30.40,
-                "t3.large": 60.80,
-                "t2.micro": 8.50,  # Legacy, in free tier
-                "t2.small": 16.80,
-                "t2.medium": 33.70,
-            },
-            "azure": {
-                "Standard_B1s": 3.80,
-                "Standard_B1ms": 7.60,
-                "Standard_B2s": 15.20,
-                "Standard_B2ms": 30.40,
-                "Standard_B4ms": 60.80,
-                "Standard_D2s_v3": 70.00,
-            },
-            "digitalocean": {
-                "s-1vcpu-1gb": 6.00,
-                "s-1vcpu-2gb": 12.00,
-                "s-2vcpu-2gb": 18.00,
-                "s-2vcpu-4gb": 24.00,
-                "s-4vcpu-8gb": 48.00,
-            },
-            "hetzner": {
-                "cx11": 3.60,
-                "cx21": 6.40,
-                "cx31": 11.60,
-                "cx41": 22.00,
-                "cx51": 43.00,
-            }
-        }
-        
-        # Additional costs
-        additional_costs = {
-            "aws": {"ip": 3.60, "storage_per_gb": 0.10},
-            "azure": {"ip": 3.60, "storage_per_gb": 0.115},
-            "digitalocean": {"ip": 0, "storage_per_gb": 0.10},
-            "hetzner": {"ip": 0, "storage_per_gb": 0.05},
-        }
-
         # Get instance type from config if available
         instance_type = None
         if config and "instance_type" in config:
             instance_type = config["instance_type"]
         
-        # Calculate instance cost
-        monthly_cost = 0
-        if instance_type and provider in instance_pricing:
-            if instance_type in instance_pricing[provider]:
-                monthly_cost = instance_pricing[provider][instance_type]
-            else:
-                # Default to cheapest if instance type not found
-                monthly_cost = min(instance_pricing[provider].values())
-        else:
-            # Default costs if no instance type specified
-            default_costs = {"aws": 7.60, "azure": 7.60, "digitalocean": 6.00, "hetzner": 3.60}
-            monthly_cost = default_costs.get(provider, 10.00)
-        
-        # Add IP cost if public IP exists
-        if resources.get("public_ip"):
-            monthly_cost += additional_costs.get(provider, {}).get("ip", 3.60)
-        
-        # Add storage cost (default 20GB)
-        storage_gb = resources.get("storage_gb", 20)
-        storage_cost = storage_gb * additional_costs.get(provider, {}).get("storage_per_gb", 0.10)
-        monthly_cost += storage_cost
+        monthly, yearly, daily = _estimate_cost_totals(
+            provider,
+            instance_type,
+            bool(resources.get("public_ip")),
+            resources.get("storage_gb", 20),
+        )
 
         return {
-            "monthly": round(monthly_cost, 2),
-            "yearly": round(monthly_cost * 12, 2),
-            "daily": round(monthly_cost / 30, 2),
+            "monthly": monthly,
+            "yearly": yearly,
+            "daily": daily,
             "currency": "USD",
         }
 
     def generate_summary_report(self) -> str:
         """Generate a summary report of all deployments"""
-        active_deployments = self.get_active_deployments()
-
-        report_lines = [
-            "=" * 60,
-            "ProxyGen Deployment Inventory Report",
-            "=" * 60,
-            f"Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}",
-            "",
-            f"Total Active Deployments: {len(active_deployments)}",
-            "",
-        ]
+        if self._records is None:
+            self._rebuild_columns()
 
-        # Group by provider
-        by_provider = {}
+        # Group active deployments by provider and total them in one pass
+        by_provider = defaultdict(list)
+        active_count = 0
         total_monthly_cost = 0
         total_clients = 0
 
-        for deployment in active_deployments:
-            provider = deployment["provider"]
-            if provider not in by_provider:
-                by_provider[provider] = []
+        for deployment, status, provider, monthly_cost in zip(
+            self._records, self._status, self._provider, self._monthly_cost
+        ):
+            if status != "active":
+                continue
             by_provider[provider].append(deployment)
-            total_monthly_cost += deployment.get("cost_estimate", {}).get("monthly", 0)
+            active_count += 1
+            total_monthly_cost += monthly_cost
             total_clients += len(deployment.get("clients", []))
 
+        rule = "=" * 60
+        report = io.StringIO()
+        write = report.write
+
+        write(f"{rule}\nProxyGen Deployment Inventory Report\n{rule}\n")
+        write(f"Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n\n")
+        write(f"Total Active Deployments: {active_count}\n")
+
         # Provider summaries
         for provider, deployments in by_provider.items():
-            report_lines.append(f"\n{provider.upper()} Deployments:")
-            report_lines.append("-" * 40)
+            write(f"\n\n{provider.upper()} Deployments:\n")
+            write("-" * 40)
 
             for dep in deployments:
-                report_lines.append(f"  ID: {dep['id']}")
-                report_lines.append(f"    Region: {dep['region']}")
-                report_lines.append(f"    Status: {dep['status']}")
-                report_lines.append(f"    Created: {dep['created_at']}")
-                report_lines.append(
-                    f"    Monthly Cost: ${dep.get('cost_estimate', {}).get('monthly', 0):.2f}"
-                )
-                report_lines.append(f"    Clients: {len(dep.get('clients', []))}")
+                write(f"\n  ID: {dep['id']}")
+                write(f"\n    Region: {dep['region']}")
+                write(f"\n    Status: {dep['status']}")
+                write(f"\n    Created: {dep['created_at']}")
+                write(f"\n    Monthly Cost: ${dep.get('cost_estimate', {}).get('monthly', 0):.2f}")
+                write(f"\n    Clients: {len(dep.get('clients', []))}")
 
                 if dep.get("resources", {}).get("public_ip"):
-                    report_lines.append(
-                        f"    Public IP: {dep['resources']['public_ip']}"
-                    )
+                    write(f"\n    Public IP: {dep['resources']['public_ip']}")
 
         # Summary statistics
-        report_lines.extend(
-            [
-                "",
-                "=" * 60,
-                "Summary Statistics:",
-                f"  Total Monthly Cost: ${total_monthly_cost:.2f}",
-                f"  Total Yearly Cost: ${total_monthly_cost * 12:.2f}",
-                f"  Total Clients: {total_clients}",
-                f"  Providers in Use: {', '.join(by_provider.keys())}",
-                "=" * 60,
-            ]
-        )
+        write(f"\n\n{rule}\nSummary Statistics:\n")
+        write(f"  Total Monthly Cost: ${total_monthly_cost:.2f}\n")
+        write(f"  Total Yearly Cost: ${total_monthly_cost * 12:.2f}\n")
+        write(f"  Total Clients: {total_clients}\n")
+        write(f"  Providers in Use: {', '.join(by_provider.keys())}\n")
+        write(rule)
 
-        return "\n".join(report_lines)
+        return report.getvalue()
 
-    def export_inventory(self, format: str = "json") -> str:
-        """Export inventory in various formats"""
+    def export_inventory(self, format: str = "json", out: Optional[IO[str]] = None) -> Optional[str]:
+        """Export inventory in various formats
+
+        When out is given the export is written to it and None is returned.
+        """
         if format == "json":
-            return json.dumps(self.inventory, indent=2, default=str)
+            data = _dumps_inventory(self.inventory).decode()
 
         elif format == "csv":
             import csv
-            import io
 
-            output = io.StringIO()
+            output = io.StringIO() if out is None else out
             writer = csv.writer(output)
 
             # Write header
@@ -367,7 +578,7 @@ class DeploymentTracker:
             )
 
             # Write data
-            for deployment in self.list_all_deployments():
+            for deployment in self._iter_all_deployments():
                 writer.writerow(
                     [
                         deployment["id"],
@@ -381,50 +592,63 @@ class DeploymentTracker:
                     ]
                 )
 
-            return output.getvalue()
+            return output.getvalue() if out is None else None
 
         elif format == "yaml":
             import yaml
 
-            return yaml.dump(self.inventory, default_flow_style=False, default=str)
+            data = yaml.dump(self.inventory, default_flow_style=False, default=str)
 
         else:
             raise ValueError(f"Unsupported export format: {format}")
 
+        if out is None:
+            return data
+        out.write(data)
+        return None
+
     def cleanup_destroyed_deployments(self, days_old: int = 30):
         """Remove destroyed deployments older than specified days"""
-        from datetime import timedelta
-
-        cutoff_date = datetime.now() - timedelta(days=days_old)
+        cutoff_ts = (datetime.now() - timedelta(days=days_old)).timestamp()
         cleaned = 0
 
-        for provider in list(self.inventory["deployments"].keys()):
-            for region in list(self.inventory["deployments"][provider].keys()):
-                deployments = self.inventory["deployments"][provider][region]
-                active_deployments = []
-
-                for deployment in deployments:
-                    if deployment.get("status") == "destroyed":
-                        destroyed_at = datetime.fromisoformat(
-                            deployment.get("destroyed_at", deployment["created_at"])
-                        )
-                        if destroyed_at < cutoff_date:
-                            cleaned += 1
-                            continue
+        inventory = self.inventory["deployments"]
+        pruned = []
+        empty_regions = []
+
+        for provider, regions in inventory.items():
+            for region, deployments in regions.items():
+                kept = [
+                    deployment
+                    for deployment in deployments
+                    if deployment.get("status") != "destroyed"
+                    or _iso_timestamp(
+                        deployment.get("destroyed_at", deployment["created_at"])
+                    ) >= cutoff_ts
+                ]
+                if len(kept) < len(deployments):
+                    cleaned += len(deployments) - len(kept)
+                    pruned.append((regions, region, kept))
 
-                    active_deployments.append(deployment)
+                if not kept:
+                    empty_regions.append((provider, region))
 
-                self.inventory["deployments"][provider][region] = active_deployments
+        if cleaned > 0:
+            # Back up the inventory as it was before anything is removed
+            self.checkpoint()
 
-                # Clean up empty regions
-                if not active_deployments:
-                    del self.inventory["deployments"][provider][region]
+        for regions, region, kept in pruned:
+            regions[region] = kept
 
-            # Clean up empty providers
-            if not self.inventory["deployments"][provider]:
-                del self.inventory["deployments"][provider]
+        # Clean up empty regions, then providers left without regions
+        for provider, region in empty_regions:
+            del inventory[provider][region]
+            if not inventory[provider]:
+                del inventory[provider]
 
         if cleaned > 0:
+            # Removed records shift list positions
+            self._rebuild_index()
             self.save_inventory()
             logger.info(f"Cleaned up {cleaned} old destroyed deployments")
 
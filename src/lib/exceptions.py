@@ -3,8 +3,9 @@ Custom exceptions for ProxyGen application.
 Provides structured error handling with recovery suggestions.
 """
 
+import functools
 import logging
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Tuple
 from enum import Enum
 
 
@@ -32,6 +33,19 @@ class ErrorCategory(Enum):
     SECURITY = "security"
 
 
+logger = logging.getLogger(__name__)
+
+# Log prefixes and levels, resolved once rather than on every error
+_CATEGORY_UPPER = {category: category.value.upper() for category in ErrorCategory}
+
+_SEVERITY_LEVELS = {
+    ErrorSeverity.CRITICAL: logging.CRITICAL,
+    ErrorSeverity.HIGH: logging.ERROR,
+    ErrorSeverity.MEDIUM: logging.WARNING,
+    ErrorSeverity.LOW: logging.INFO,
+}
+
+
 class ProxyGenError(Exception):
     """Base exception for all ProxyGen errors."""
     
@@ -54,25 +68,23 @@ class ProxyGenError(Exception):
         self.context = context or {}
         self.original_error = original_error
         
-        # Log the error
-        self._log_error()
+        # Log the error, skipping the formatting when the level is disabled
+        if logger.isEnabledFor(_SEVERITY_LEVELS[severity]):
+            self._log_error()
     
     def _log_error(self):
         """Log the error with appropriate level."""
-        logger = logging.getLogger(__name__)
+        level = _SEVERITY_LEVELS[self.severity]
         
-        log_message = f"[{self.category.value.upper()}] {self.message}"
-        if self.error_code:
-            log_message = f"{self.error_code}: {log_message}"
+        # Tracebacks are only attached for high and critical errors
+        exc_info = self.original_error if level >= logging.ERROR else None
         
-        if self.severity == ErrorSeverity.CRITICAL:
-            logger.critical(log_message, exc_info=self.original_error)
-        elif self.severity == ErrorSeverity.HIGH:
-            logger.error(log_message, exc_info=self.original_error)
-        elif self.severity == ErrorSeverity.MEDIUM:
-            logger.warning(log_message)
+        if self.error_code:
+            logger.log(level, "%s: [%s] %s", self.error_code,
+                       _CATEGORY_UPPER[self.category], self.message, exc_info=exc_info)
         else:
-            logger.info(log_message)
+            logger.log(level, "[%s] %s", _CATEGORY_UPPER[self.category],
+                       self.message, exc_info=exc_info)
     
     def get_user_message(self) -> str:
         """Get user-friendly error message with suggestions."""
@@ -264,103 +276,93 @@ class SubprocessError(ProxyGenError):
 
 
 # Error recovery strategies
+_RECOVERY_SUGGESTIONS: Dict[ErrorCategory, Tuple[str, ...]] = {
+    ErrorCategory.AUTHENTICATION: (
+        "Check your cloud provider credentials",
+        "Verify your account has necessary permissions",
+        "Try running './proxygen setup --credentials' to reconfigure",
+        "Check if your credentials have expired",
+    ),
+    ErrorCategory.NETWORK: (
+        "Check your internet connection",
+        "Verify firewall settings aren't blocking connections",
+        "Try again in a few minutes (temporary network issue)",
+        "Check if the target service is operational",
+    ),
+    ErrorCategory.TERRAFORM: (
+        "Check Terraform is installed and in PATH",
+        "Verify Terraform state isn't locked",
+        "Try running 'terraform init' in the provider directory",
+        "Check if resources already exist in the cloud",
+    ),
+    ErrorCategory.SSH: (
+        "Verify the server is running and accessible",
+        "Check SSH key permissions (should be 600)",
+        "Ensure security groups allow SSH access (port 22)",
+        "Try connecting manually with: ssh -i <key> ubuntu@<ip>",
+    ),
+    ErrorCategory.VALIDATION: (
+        "Check the format of your input parameters",
+        "Verify all required arguments are provided",
+        "Use --help to see correct command syntax",
+        "Check examples in documentation",
+    ),
+    ErrorCategory.FILESYSTEM: (
+        "Check file/directory permissions",
+        "Verify sufficient disk space",
+        "Ensure the path exists and is accessible",
+        "Check if file is locked by another process",
+    ),
+    ErrorCategory.CONFIGURATION: (
+        "Check configuration file syntax",
+        "Verify all required configuration values are set",
+        "Try regenerating configuration with default values",
+        "Check configuration file permissions",
+    ),
+}
+
+_NEXT_STEPS: Dict[ErrorSeverity, Tuple[str, ...]] = {
+    ErrorSeverity.CRITICAL: (
+        "Stop current operations to prevent further issues",
+        "Review error logs for detailed information",
+        "Contact support if issue persists",
+    ),
+    ErrorSeverity.HIGH: (
+        "Review the specific error message above",
+        "Try the suggested recovery steps",
+        "Check system status and retry if appropriate",
+    ),
+    ErrorSeverity.MEDIUM: (
+        "Review input parameters and try again",
+        "Check documentation for correct usage",
+        "Use --help flag for command syntax",
+    ),
+}
+
+
 class ErrorRecovery:
     """Provides error recovery strategies and suggestions."""
     
     @staticmethod
     def get_recovery_suggestions(error: ProxyGenError) -> List[str]:
         """Get context-specific recovery suggestions."""
-        suggestions = []
-        
-        if error.category == ErrorCategory.AUTHENTICATION:
-            suggestions.extend([
-                "Check your cloud provider credentials",
-                "Verify your account has necessary permissions",
-                "Try running './proxygen setup --credentials' to reconfigure",
-                "Check if your credentials have expired"
-            ])
-        
-        elif error.category == ErrorCategory.NETWORK:
-            suggestions.extend([
-                "Check your internet connection",
-                "Verify firewall settings aren't blocking connections",
-                "Try again in a few minutes (temporary network issue)",
-                "Check if the target service is operational"
-            ])
-        
-        elif error.category == ErrorCategory.TERRAFORM:
-            suggestions.extend([
-                "Check Terraform is installed and in PATH",
-                "Verify Terraform state isn't locked",
-                "Try running 'terraform init' in the provider directory",
-                "Check if resources already exist in the cloud"
-            ])
-        
-        elif error.category == ErrorCategory.SSH:
-            suggestions.extend([
-                "Verify the server is running and accessible",
-                "Check SSH key permissions (should be 600)",
-                "Ensure security groups allow SSH access (port 22)",
-                "Try connecting manually with: ssh -i <key> ubuntu@<ip>"
-            ])
-        
-        elif error.category == ErrorCategory.VALIDATION:
-            suggestions.extend([
-                "Check the format of your input parameters",
-                "Verify all required arguments are provided",
-                "Use --help to see correct command syntax",
-                "Check examples in documentation"
-            ])
-        
-        elif error.category == ErrorCategory.FILESYSTEM:
-            suggestions.extend([
-                "Check file/directory permissions",
-                "Verify sufficient disk space",
-                "Ensure the path exists and is accessible",
-                "Check if file is locked by another process"
-            ])
-        
-        elif error.category == ErrorCategory.CONFIGURATION:
-            suggestions.extend([
-                "Check configuration file syntax",
-                "Verify all required configuration values are set",
-                "Try regenerating configuration with default values",
-                "Check configuration file permissions"
-            ])
-        
-        return suggestions
+        return list(_RECOVERY_SUGGESTIONS.get(error.category, ()))
     
     @staticmethod
     def suggest_next_steps(error: ProxyGenError) -> List[str]:
         """Suggest next steps based on error context."""
-        steps = []
-        
-        if error.severity == ErrorSeverity.CRITICAL:
-            steps.extend([
-                "Stop current operations to prevent further issues",
-                "Review error logs for detailed information",
-                "Contact support if issue persists"
-            ])
-        
-        elif error.severity == ErrorSeverity.HIGH:
-            steps.extend([
-                "Review the specific error message above",
-                "Try the suggested recovery steps",
-                "Check system status and retry if appropriate"
-            ])
-        
-        elif error.severity == ErrorSeverity.MEDIUM:
-            steps.extend([
-                "Review input parameters and try again",
-                "Check documentation for correct usage",
-                "Use --help flag for command syntax"
-            ])
-        
-        return steps
+        return list(_NEXT_STEPS.get(error.severity, ()))
+
+
+_UNEXPECTED_ERROR_SUGGESTIONS = (
+    "Check logs for detailed error information",
+    "Retry the operation",
+)
 
 
 def handle_error(func):
     """Decorator for consistent error handling."""
+    @functools.wraps(func)
     def wrapper(*args, **kwargs):
         try:
             return func(*args, **kwargs)
@@ -374,7 +376,7 @@ def handle_error(func):
                 category=ErrorCategory.VALIDATION,
                 severity=ErrorSeverity.HIGH,
                 original_error=e,
-                suggestions=["Check logs for detailed error information", "Retry the operation"]
+                suggestions=list(_UNEXPECTED_ERROR_SUGGESTIONS)
             )
     return wrapper
 
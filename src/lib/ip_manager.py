@@ -5,29 +5,71 @@ Handles dynamic IP allocation and prevents IP address conflicts
 """
 
 import json
+import logging
+import os
 import time
-import random
+import sys
+import zlib
+from collections import Counter, defaultdict
+from contextlib import contextmanager
 from datetime import datetime, timedelta
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
+
+try:
+    import orjson
+
+    _loads = orjson.loads
+
+    def _dumps_registry(obj) -> bytes:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2, default=str)
+
+except ImportError:  # orjson is optional; fall back to the stdlib codec
+    _loads = json.loads
+
+    def _dumps_registry(obj) -> bytes:
+        return json.dumps(obj, indent=2, default=str).encode()
+
+logger = logging.getLogger(__name__)
 
 
 class IPManager:
     """Manages IP address allocation and prevents reuse conflicts"""
 
+    # Journal entries to accumulate before folding them into the registry
+    JOURNAL_COMPACT_AT = 1000
+
     def __init__(self, base_dir: Path):
         self.base_dir = base_dir
         self.state_dir = base_dir / "state"
         self.ip_registry = self.state_dir / "ip_registry.json"
-        self.load_ip_registry()
+        self.journal_file = self.state_dir / "ip_registry.jsonl"
+        self._by_deployment: Dict[str, str] = {}
+        self._active_by_region: Dict[Tuple[str, str], Dict[str, str]] = defaultdict(dict)
+        self._status_counts: Counter = Counter()
+        self._used_subnets: Counter = Counter()
+        self._journal = None
+        self._journal_entries = 0
+        self._batch_depth = 0
+        # Bumped on every registry change; keys the cached usage report
+        self._version = 0
+        self._report_cache: Tuple[int, Dict] = (-1, {})
+        # Loaded on first use, so managers that never touch it skip the read
+        self._registry = None
+
+    @property
+    def registry(self) -> Dict:
+        """IP address registry, loaded from disk on first access"""
+        if self._registry is None:
+            self.load_ip_registry()
+        return self._registry
 
     def load_ip_registry(self):
         """Load IP address registry"""
         if self.ip_registry.exists():
-            with open(self.ip_registry, "r") as f:
-                self.registry = json.load(f)
+            self._registry = _loads(self.ip_registry.read_bytes())
         else:
-            self.registry = {
+            self._registry = {
                 "elastic_ips": {},
                 "server_ips": {},
                 "client_subnets": {},
@@ -35,105 +77,307 @@ class IPManager:
             }
             self.save_ip_registry()
 
+        self._rebuild_indexes()
+        self._used_subnets = Counter(self.registry["client_subnets"].values())
+        self._replay_journal()
+
+    def _replay_journal(self):
+        """Apply journaled changes made since the registry snapshot"""
+        self._journal_entries = 0
+        if not self.journal_file.exists():
+            return
+
+        snapshot_seq = self.registry.get("journal_seq", 0)
+        good_end = 0
+        with open(self.journal_file, "rb") as f:
+            for line in f:
+                try:
+                    # A write cut short by a crash can only be the last line,
+                    # and may have lost just its newline
+                    if not line.endswith(b"\n"):
+                        raise ValueError("missing newline")
+                    entry = _loads(line)
+                except ValueError:
+                    logger.warning("Discarding truncated IP registry journal entry")
+                    break
+                good_end += len(line)
+                if entry["seq"] > snapshot_seq:
+                    self._apply(entry)
+                    self._journal_entries += 1
+
+        # Cut the torn tail off, or the next entry would be appended to it
+        # and every later load would stop at the same spot
+        if good_end < self.journal_file.stat().st_size:
+            os.truncate(self.journal_file, good_end)
+
+    def _apply(self, entry: Dict):
+        """Apply one journal entry to the in-memory registry"""
+        if entry["op"] == "register":
+            self._store_ip(entry["key"], entry["ip"])
+        elif entry["op"] == "update":
+            ip_info = self.registry["elastic_ips"].get(entry["key"])
+            if ip_info is not None:
+                fields = entry["fields"]
+                if "status" in fields:
+                    self._set_status(entry["key"], ip_info, fields["status"])
+                ip_info.update(fields)
+        elif entry["op"] == "subnet":
+            self._assign_subnet(entry["deployment_id"], entry["subnet"])
+
+        self.registry["journal_seq"] = entry["seq"]
+        self.registry["last_updated"] = entry["at"]
+        self._version += 1
+
+    def _commit(self, entry: Dict, now: float):
+        """Apply a change and append it to the journal
+
+        The registry file is only rewritten once JOURNAL_COMPACT_AT entries
+        have accumulated, instead of on every change. Inside batch() the
+        journal is flushed once when the batch ends.
+        """
+        entry["seq"] = self.registry.get("journal_seq", 0) + 1
+        entry["at"] = datetime.fromtimestamp(now).isoformat()
+        self._apply(entry)
+
+        if self._journal is None:
+            self._journal = open(self.journal_file, "a", buffering=1 << 16)
+        self._journal.write(json.dumps(entry, default=str) + "\n")
+        if self._batch_depth == 0:
+            self._journal.flush()
+
+        self._journal_entries += 1
+        if self._journal_entries >= self.JOURNAL_COMPACT_AT:
+            self.save_ip_registry()
+
+    def _rebuild_indexes(self):
+        """Index elastic IP keys by deployment ID and active IPs by region
+
+        Also recounts entries per status for the usage report.
+        """
+        self._version += 1
+        self._by_deployment = {}
+        self._active_by_region = defaultdict(dict)
+        self._status_counts = Counter()
+        for key, ip_info in self.registry["elastic_ips"].items():
+            self._index_ip(key, ip_info)
+
+    def _index_ip(self, key: str, ip_info: Dict):
+        """Add one elastic IP entry to the lookup indexes"""
+        # Provider and region repeat across many entries; share one string
+        # object for each instead of a decoded copy per entry
+        ip_info["provider"] = sys.intern(ip_info["provider"])
+        ip_info["region"] = sys.intern(ip_info["region"])
+        # First entry in registry order wins, as a full scan would
+        self._by_deployment.setdefault(ip_info["deployment_id"], key)
+        self._status_counts[ip_info["status"]] += 1
+        if ip_info["status"] == "active":
+            self._active_by_region[(ip_info["provider"], ip_info["region"])][key] = (
+                ip_info["public_ip"])
+
+    def _set_status(self, key: str, ip_info: Dict, status: str):
+        """Change an entry's status, keeping the counts and active index in step"""
+        self._status_counts[ip_info["status"]] -= 1
+        self._status_counts[status] += 1
+        active = self._active_by_region[(ip_info["provider"], ip_info["region"])]
+        if status == "active":
+            active[key] = ip_info["public_ip"]
+        else:
+            active.pop(key, None)
+        ip_info["status"] = status
+
+    def _store_ip(self, key: str, ip_info: Dict):
+        """Store an elastic IP entry and keep the indexes in step"""
+        previous = self.registry["elastic_ips"].get(key)
+        self.registry["elastic_ips"][key] = ip_info
+        if previous is None:
+            self._index_ip(key, ip_info)
+        elif (previous["deployment_id"], previous["provider"], previous["region"]) != (
+                ip_info["deployment_id"], ip_info["provider"], ip_info["region"]):
+            # An ambiguous key was reused by another deployment
+            self._rebuild_indexes()
+        else:
+            # Same deployment registered again; its index entries carry over
+            self._status_counts[previous["status"]] -= 1
+            if ip_info["status"] != "active":
+                self._active_by_region[(ip_info["provider"], ip_info["region"])].pop(key, None)
+            self._index_ip(key, ip_info)
+
+    def _assign_subnet(self, deployment_id: str, subnet: str):
+        """Record a deployment's client subnet and keep the usage counts in step"""
+        client_subnets = self.registry["client_subnets"]
+        previous = client_subnets.get(deployment_id)
+        client_subnets[deployment_id] = subnet
+        # A replaced subnet is free again once no deployment holds it
+        if previous is not None:
+            self._used_subnets[previous] -= 1
+            if not self._used_subnets[previous]:
+                del self._used_subnets[previous]
+        self._used_subnets[subnet] += 1
+
     def save_ip_registry(self):
-        """Save IP address registry"""
+        """Save IP address registry
+
+        Writes a full snapshot and truncates the journal it supersedes.
+        """
         self.registry["last_updated"] = datetime.now().isoformat()
-        with open(self.ip_registry, "w") as f:
-            json.dump(self.registry, f, indent=2, default=str)
+        self._version += 1
+        # Write a sibling temp file and rename it over the registry, so a
+        # crash mid-write never leaves a truncated registry behind
+        tmp_file = self.ip_registry.with_suffix(".json.tmp")
+        with open(tmp_file, "wb") as f:
+            f.write(_dumps_registry(self.registry))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_file, self.ip_registry)
+
+        # Everything journaled so far is now in the snapshot
+        if self._journal is not None:
+            self._journal.close()
+            self._journal = None
+        if self.journal_file.exists():
+            self.journal_file.write_text("")
+        self._journal_entries = 0
+
+    @contextmanager
+    def batch(self):
+        """Group registry changes so the journal is flushed once"""
+        self._batch_depth += 1
+        try:
+            yield self
+        finally:
+            self._batch_depth -= 1
+            if self._batch_depth == 0 and self._journal is not None:
+                self._journal.flush()
 
     def register_deployment_ip(self, deployment_id: str, provider: str, 
                              region: str, public_ip: str):
         """Register an IP address for a deployment"""
         key = f"{provider}-{region}-{deployment_id}"
-        self.registry["elastic_ips"][key] = {
+        now = time.time()
+        ip_info = {
             "public_ip": public_ip,
             "deployment_id": deployment_id,
             "provider": provider,
             "region": region,
-            "allocated_at": datetime.now().isoformat(),
+            "allocated_at": datetime.fromtimestamp(now).isoformat(),
+            "allocated_ts": now,
             "status": "active"
         }
-        self.save_ip_registry()
+        self._commit({"op": "register", "key": key, "ip": ip_info}, now)
 
     def release_deployment_ip(self, deployment_id: str):
         """Release IP address when deployment is destroyed"""
-        for key, ip_info in list(self.registry["elastic_ips"].items()):
-            if ip_info["deployment_id"] == deployment_id:
-                ip_info["status"] = "released"
-                ip_info["released_at"] = datetime.now().isoformat()
-                break
-        self.save_ip_registry()
+        key = self._lookup_key(deployment_id)
+        # Nothing to record if it is unknown or already released
+        if key is not None and self.registry["elastic_ips"][key]["status"] != "released":
+            now = time.time()
+            self._commit({
+                "op": "update",
+                "key": key,
+                "fields": {
+                    "status": "released",
+                    "released_at": datetime.fromtimestamp(now).isoformat(),
+                    "released_ts": now,
+                },
+            }, now)
 
     def check_ip_conflicts(self, provider: str, region: str) -> List[str]:
         """Check for active IP addresses in the same region"""
-        active_ips = []
-        for key, ip_info in self.registry["elastic_ips"].items():
-            if (ip_info["provider"] == provider and 
-                ip_info["region"] == region and 
-                ip_info["status"] == "active"):
-                active_ips.append(ip_info["public_ip"])
-        return active_ips
+        if self._registry is None:
+            self.load_ip_registry()
+        return list(self._active_by_region.get((provider, region), {}).values())
 
     def generate_client_subnet(self, deployment_id: str) -> str:
         """Generate a unique client subnet for a deployment"""
-        # Use deployment timestamp to ensure uniqueness
-        timestamp = int(time.time())
+        if self._registry is None:
+            self.load_ip_registry()
+
+        # Seed from the deployment ID so deployments created in the same
+        # second don't start from the same subnet
+        seed = zlib.crc32(deployment_id.encode())
         
-        # Generate subnet based on timestamp (avoid common ranges)
-        # Use 10.x.x.0/24 where x is derived from timestamp
-        subnet_base = (timestamp % 200) + 10  # Range 10-209
-        subnet_second = (timestamp // 200) % 255
+        # Generate subnet based on the seed (avoid common ranges)
+        # Use 10.x.y.0/24 where x and y are derived from the seed
+        subnet_base = (seed % 200) + 10  # Range 10-209
+        subnet_second = (seed >> 8) % 256
         
         subnet = f"10.{subnet_base}.{subnet_second}.0/24"
         
         # Ensure it's not already used
-        while subnet in self.registry["client_subnets"].values():
-            subnet_base = (subnet_base + 1) % 200 + 10
+        while subnet in self._used_subnets:
+            # Step to the next base, wrapping within the 10-209 range
+            subnet_base = (subnet_base - 10 + 1) % 200 + 10
             subnet = f"10.{subnet_base}.{subnet_second}.0/24"
         
-        self.registry["client_subnets"][deployment_id] = subnet
-        self.save_ip_registry()
+        self._commit(
+            {"op": "subnet", "deployment_id": deployment_id, "subnet": subnet},
+            time.time(),
+        )
         return subnet
 
     def get_deployment_info(self, deployment_id: str) -> Optional[Dict]:
         """Get IP information for a deployment"""
-        for key, ip_info in self.registry["elastic_ips"].items():
-            if ip_info["deployment_id"] == deployment_id:
-                return ip_info
-        return None
+        key = self._lookup_key(deployment_id)
+        if key is None:
+            return None
+        return self.registry["elastic_ips"][key]
+
+    def _lookup_key(self, deployment_id: str) -> Optional[str]:
+        """Find the elastic IP key registered for a deployment"""
+        if self._registry is None:
+            self.load_ip_registry()
+        return self._by_deployment.get(deployment_id)
 
     def cleanup_old_ips(self, max_age_days: int = 30):
         """Clean up old released IP entries"""
-        cutoff_date = datetime.now() - timedelta(days=max_age_days)
+        cutoff = (datetime.now() - timedelta(days=max_age_days)).timestamp()
+        elastic_ips = self.registry["elastic_ips"]
         
-        for key in list(self.registry["elastic_ips"].keys()):
-            ip_info = self.registry["elastic_ips"][key]
-            if ip_info["status"] == "released" and "released_at" in ip_info:
-                released_date = datetime.fromisoformat(ip_info["released_at"])
-                if released_date < cutoff_date:
-                    del self.registry["elastic_ips"][key]
+        # Rebuild the mapping in one pass rather than deleting key by key
+        kept = {
+            key: ip_info
+            for key, ip_info in elastic_ips.items()
+            if not self._released_before(ip_info, cutoff)
+        }
         
-        self.save_ip_registry()
+        # Only rewrite the registry when something was removed
+        if len(kept) < len(elastic_ips):
+            self.registry["elastic_ips"] = kept
+            self._rebuild_indexes()
+            self.save_ip_registry()
+
+    @staticmethod
+    def _released_before(ip_info: Dict, cutoff: float) -> bool:
+        """Check whether an entry was released before the cutoff timestamp"""
+        if ip_info["status"] != "released" or "released_at" not in ip_info:
+            return False
+        released_ts = ip_info.get("released_ts")
+        if released_ts is None:
+            # Entries written before released_ts was recorded
+            released_ts = datetime.fromisoformat(ip_info["released_at"]).timestamp()
+        return released_ts < cutoff
 
     def force_new_ip_allocation(self, deployment_id: str):
         """Force allocation of a new IP by marking current as avoid"""
-        existing = self.get_deployment_info(deployment_id)
-        if existing:
-            existing["status"] = "avoid"
-            existing["avoid_reason"] = "forced_new_allocation"
-            self.save_ip_registry()
+        key = self._lookup_key(deployment_id)
+        if key is not None and self.registry["elastic_ips"][key]["status"] != "avoid":
+            self._commit({
+                "op": "update",
+                "key": key,
+                "fields": {"status": "avoid", "avoid_reason": "forced_new_allocation"},
+            }, time.time())
 
     def get_ip_usage_report(self) -> Dict:
         """Generate IP usage report"""
-        active_count = sum(1 for ip in self.registry["elastic_ips"].values() 
-                          if ip["status"] == "active")
-        released_count = sum(1 for ip in self.registry["elastic_ips"].values() 
-                           if ip["status"] == "released")
-        
-        return {
-            "total_ips": len(self.registry["elastic_ips"]),
-            "active_ips": active_count,
-            "released_ips": released_count,
-            "client_subnets": len(self.registry["client_subnets"]),
-            "last_updated": self.registry["last_updated"]
-        }
\ No newline at end of file
+        registry = self.registry
+        version, report = self._report_cache
+        if version != self._version:
+            report = {
+                "total_ips": len(registry["elastic_ips"]),
+                "active_ips": self._status_counts["active"],
+                "released_ips": self._status_counts["released"],
+                "client_subnets": len(registry["client_subnets"]),
+                "last_updated": registry["last_updated"]
+            }
+            self._report_cache = (self._version, report)
+        return dict(report)
\ No newline at end of file
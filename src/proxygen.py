@@ -2679,6 +2679,7 @@ def main():
                             split_config = adv_config.configure_split_tunnel(args.split_tunnel)
                             # Update client config with split tunneling
 
+                        client_mgr.close()
                         logger.info(f"Client {client_name} added with advanced features")
                     else:
                         proxygen.add_client(client_name, args.server)
@@ -2752,10 +2753,9 @@ def main():
                                     print(f"    IP: {dep.get('public_ip', 'N/A')}")
             elif args.export:
                 # Export inventory
-                export_data = proxygen.tracker.export_inventory(args.export)
                 export_file = proxygen.state_dir / f"deployment_export.{args.export}"
                 with open(export_file, "w") as f:
-                    f.write(export_data)
+                    proxygen.tracker.export_inventory(args.export, f)
                 logger.info(f"Deployment data exported to: {export_file}")
             elif args.detailed:
                 # Show detailed deployment report
@@ -0,0 +1,17 @@
+"""Shared fixtures for the ProxyGen test suite"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+# Modules are imported as lib.<name>, as proxygen.py does
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+
+@pytest.fixture
+def base_dir(tmp_path: Path) -> Path:
+    """Empty ProxyGen base directory with state/ and configs/"""
+    (tmp_path / "state").mkdir()
+    (tmp_path / "configs").mkdir()
+    return tmp_path
@@ -0,0 +1,59 @@
+"""Tests for DNS config rendering and split tunneling"""
+
+import jinja2
+import pytest
+
+from lib.advanced_config import AdvancedConfig, _fast_cidr_valid
+
+
+def test_dns_configs_render_provider_fields():
+    config = AdvancedConfig().configure_dns_over_https("cloudflare")
+
+    assert config["resolved_config"].startswith("[Resolve]\nDNS=")
+    assert "{{" not in config["stubby_config"]
+    assert 'tls_auth_name: ""' not in config["stubby_config"]
+
+
+def test_dns_configs_reject_missing_fields():
+    advanced = AdvancedConfig()
+    provider = dict(advanced.dns_providers["cloudflare"])
+    del provider["dot_hostname"]
+    advanced.dns_providers["broken"] = provider
+
+    with pytest.raises(jinja2.UndefinedError):
+        advanced.configure_dns_over_https("broken")
+
+
+def test_routing_rules_are_shared_and_read_only():
+    include, exclude = ["10.0.0.0/8"], ["10.1.0.0/16"]
+    first = AdvancedConfig().configure_split_tunnel("custom", include, exclude)
+    second = AdvancedConfig().configure_split_tunnel("custom", include, exclude)
+
+    rules = first["routing_rules"]
+    assert second["routing_rules"] is rules
+    assert rules["linux"]["up"][0] == "ip route add 10.0.0.0/8 dev %i"
+    with pytest.raises(TypeError):
+        rules["linux"]["up"] = []
+    with pytest.raises(AttributeError):
+        rules["linux"]["up"].append("ip route add 0.0.0.0/0 dev %i")
+    assert AdvancedConfig._generate_routing_rules.cache_info().maxsize is not None
+
+
+@pytest.mark.parametrize(
+    "cidr,valid",
+    [
+        ("10.0.0.0/8", True),
+        ("10.0.0.0/255.0.0.0", True),
+        ("2001:db8::/32", True),
+        ("192.168.1.7", True),
+        ("10.0.0.1/24", False),
+        ("2001:db8::1/32", False),
+        ("10.0.0.0/33", False),
+        ("10.0.0.0/", False),
+        ("10.0.0.0/²", False),
+        ("10.1/8", False),
+        ("not-a-cidr", False),
+    ],
+)
+def test_fast_cidr_valid_matches_strict_parsing(cidr, valid):
+    assert _fast_cidr_valid(cidr) is valid
@@ -0,0 +1,144 @@
+"""Tests for client IP allocation and config rendering"""
+
+import ipaddress
+import json
+from itertools import islice
+from pathlib import Path
+
+import jinja2
+import pytest
+
+from lib.client_manager import ClientManager
+
+
+@pytest.fixture
+def manager(base_dir):
+    manager = ClientManager(base_dir)
+    yield manager
+    manager.close()
+
+
+def _allocate(manager: ClientManager, subnet: str, ips):
+    manager._conn.executemany(
+        "INSERT INTO ip_allocations (subnet, ip_address, ip_int) VALUES (?, ?, ?)",
+        [(subnet, ip, int(ipaddress.IPv4Address(ip))) for ip in ips],
+    )
+    manager._conn.commit()
+
+
+def _expected_free(subnet: str, allocated):
+    network = ipaddress.IPv4Network(subnet)
+    taken = {int(ipaddress.IPv4Address(ip)) for ip in allocated}
+    return [
+        int(host) for host in network.hosts()
+        if int(host) & 0xFF not in (0, 1) and int(host) not in taken
+    ]
+
+
+@pytest.mark.parametrize("subnet", ["10.8.0.0/16", "10.8.0.0/15"])
+def test_iter_free_ips_around_bitmap_limit(manager, subnet):
+    # A /16 is the largest range searched with the bitmap; a /15 is swept
+    network = ipaddress.IPv4Network(subnet)
+    assert (network.num_addresses - 2 <= manager.BITMAP_MAX_HOSTS) == (
+        network.prefixlen >= 16)
+
+    allocated = ["10.8.0.2", "10.8.0.3", "10.8.0.255", "10.8.1.2", "10.8.255.254"]
+    if network.prefixlen < 16:
+        allocated += ["10.9.0.2", "10.9.255.254"]
+    _allocate(manager, subnet, allocated)
+    # Allocations in other subnets must not be counted
+    _allocate(manager, "10.8.0.0/24", ["10.8.0.4"])
+
+    assert list(manager._iter_free_ips(subnet)) == _expected_free(subnet, allocated)
+
+
+def test_iter_free_ips_bitmap_matches_sweep(manager, monkeypatch):
+    subnet = "10.20.0.0/16"
+    allocated = [f"10.20.{i}.{j}" for i in (0, 127, 255) for j in range(2, 256, 3)]
+    _allocate(manager, subnet, allocated)
+
+    bitmap = list(manager._iter_free_ips(subnet))
+    monkeypatch.setattr(manager, "BITMAP_MAX_HOSTS", 0)
+    sweep = list(manager._iter_free_ips(subnet))
+
+    assert bitmap == sweep == _expected_free(subnet, allocated)
+
+
+def test_allocate_ip_crosses_into_next_slash_16(manager):
+    subnet = "10.30.0.0/15"
+    last_of_first = ipaddress.IPv4Address("10.30.255.255")
+    _allocate(manager, subnet, [
+        str(ipaddress.IPv4Address(ip)) for ip in _expected_free(subnet, [])
+        if ip <= int(last_of_first)
+    ])
+
+    assert manager.allocate_ip(subnet, "us-east-1") == "10.31.0.2"
+    assert list(islice(manager._iter_free_ips(subnet), 2)) == [
+        int(ipaddress.IPv4Address("10.31.0.2")),
+        int(ipaddress.IPv4Address("10.31.0.3")),
+    ]
+
+
+def _server_config():
+    return {"public_key": "server-pub", "public_ip": "203.0.113.7", "wireguard_port": 51820}
+
+
+def test_client_config_renders_all_fields(manager):
+    config = manager.generate_client_config(
+        "laptop", {"private": "priv", "preshared": "psk"}, "10.8.0.2", _server_config()
+    )
+
+    assert "PrivateKey = priv" in config
+    assert "PresharedKey = psk" in config
+    assert "Endpoint = 203.0.113.7:51820" in config
+    assert "DNS = 1.1.1.1, 1.0.0.1" in config
+
+
+def test_client_config_rejects_missing_fields(manager):
+    server_config = _server_config()
+    del server_config["wireguard_port"]
+
+    with pytest.raises(jinja2.UndefinedError):
+        manager.generate_client_config(
+            "laptop", {"private": "priv", "preshared": "psk"}, "10.8.0.2", server_config
+        )
+    with pytest.raises(jinja2.UndefinedError):
+        manager.generate_client_config("laptop", {"private": "priv"}, "10.8.0.2", _server_config())
+
+
+def _write_server_config(manager: ClientManager, region: str = "aws-us-east-1"):
+    server_config = dict(_server_config(), subnet="10.8.0.0/24")
+    (manager.configs_dir / f"{region}-server.json").write_text(json.dumps(server_config))
+
+
+def test_add_client_writes_qr_code_before_returning(manager):
+    _write_server_config(manager)
+
+    client = manager.add_client("laptop", "aws-us-east-1")
+
+    assert client["ip_address"] == "10.8.0.2"
+    assert Path(client["qr_code"]).stat().st_size > 0
+
+
+def test_add_client_raises_qr_errors(manager, monkeypatch):
+    _write_server_config(manager)
+
+    def fail(*args, **kwargs):
+        raise RuntimeError("render failed")
+
+    monkeypatch.setattr(manager, "generate_qr_code", fail)
+    with pytest.raises(RuntimeError, match="render failed"):
+        manager.add_client("laptop", "aws-us-east-1")
+
+
+def test_add_clients_bulk_writes_qr_codes_by_flush(manager):
+    _write_server_config(manager)
+
+    clients = manager.add_clients_bulk([
+        {"name": "laptop", "server_region": "aws-us-east-1"},
+        {"name": "phone", "server_region": "aws-us-east-1"},
+    ])
+    manager.flush()
+
+    assert [c["ip_address"] for c in clients] == ["10.8.0.2", "10.8.0.3"]
+    assert all(Path(c["qr_code"]).exists() for c in clients)
@@ -0,0 +1,56 @@
+"""Tests for tiered bandwidth pricing and the shared pricing tables"""
+
+import pytest
+
+from lib.cost_estimator import CostEstimator, _PRICING
+
+
+def _tiered_cost(provider: str, bandwidth_gb: float) -> float:
+    """Walk the tiers one at a time, as a reference for the bisect lookup"""
+    rates = _PRICING[provider]["bandwidth"]
+    scale = CostEstimator.BANDWIDTH_RATE_SCALE.get(provider, 1.0)
+    cost, remaining = 0.0, bandwidth_gb
+    for key, width in CostEstimator.BANDWIDTH_TIERS[provider]:
+        used = remaining if width is None else min(remaining, width)
+        cost += used * rates[key] * scale
+        remaining -= used
+        if remaining <= 0:
+            break
+    return cost
+
+
+def _tier_thresholds(provider: str):
+    total = 0
+    for _, width in CostEstimator.BANDWIDTH_TIERS[provider]:
+        if width is not None:
+            total += width
+            yield total
+
+
+_CASES = [
+    (provider, bandwidth_gb)
+    for provider in CostEstimator.BANDWIDTH_TIERS
+    for threshold in _tier_thresholds(provider)
+    for bandwidth_gb in (threshold - 1, threshold - 0.5, threshold, threshold + 0.5, threshold + 1)
+] + [(provider, 0) for provider in CostEstimator.BANDWIDTH_TIERS]
+
+
+@pytest.mark.parametrize("provider,bandwidth_gb", _CASES)
+def test_bandwidth_cost_at_tier_thresholds(provider, bandwidth_gb):
+    cost = CostEstimator().calculate_bandwidth_cost(provider, bandwidth_gb)
+    assert cost == pytest.approx(_tiered_cost(provider, bandwidth_gb))
+
+
+@pytest.mark.parametrize("provider", CostEstimator.BANDWIDTH_TIERS)
+def test_bandwidth_cost_is_continuous_at_thresholds(provider):
+    estimator = CostEstimator()
+    for threshold in _tier_thresholds(provider):
+        below = estimator.calculate_bandwidth_cost(provider, threshold - 1e-6)
+        above = estimator.calculate_bandwidth_cost(provider, threshold + 1e-6)
+        assert above == pytest.approx(below, abs=1e-4)
+
+
+def test_pricing_is_read_only():
+    estimator = CostEstimator()
+    with pytest.raises(TypeError):
+        estimator.pricing["aws"]["instances"]["t3.micro"] = 0
@@ -0,0 +1,111 @@
+"""Tests for the deployment inventory journal"""
+
+import json
+
+import pytest
+
+from lib.deployment_tracker import DeploymentTracker
+
+
+def _add(tracker: DeploymentTracker, deployment_id: str) -> str:
+    return tracker.add_deployment(
+        deployment_id, "aws", "us-east-1", {"instance_type": "t3.micro"}
+    )
+
+
+def _journal_lines(tracker: DeploymentTracker):
+    return tracker.journal_file.read_text().splitlines()
+
+
+def test_changes_are_journaled_not_snapshotted(base_dir):
+    tracker = DeploymentTracker(base_dir)
+    snapshot = tracker.inventory_file.read_bytes()
+
+    _add(tracker, "dep-1")
+    tracker.update_deployment_status("dep-1", "stopped")
+    tracker.add_client_to_deployment("dep-1", {"name": "laptop"})
+
+    assert tracker.inventory_file.read_bytes() == snapshot
+    assert [json.loads(line)["op"] for line in _journal_lines(tracker)] == [
+        "add", "update", "client"
+    ]
+
+
+def test_replay_restores_journaled_changes(base_dir):
+    tracker = DeploymentTracker(base_dir)
+    _add(tracker, "dep-1")
+    _add(tracker, "dep-2")
+    tracker.update_deployment_status("dep-1", "stopped")
+    tracker.add_client_to_deployment("dep-2", {"name": "phone"})
+    tracker.remove_deployment("dep-2")
+
+    reloaded = DeploymentTracker(base_dir)
+
+    assert reloaded.inventory == tracker.inventory
+    assert reloaded.get_deployment("dep-1")["status"] == "stopped"
+    assert reloaded.get_deployment("dep-2")["status"] == "destroyed"
+    assert [c["name"] for c in reloaded.get_deployment("dep-2")["clients"]] == ["phone"]
+    assert [d["id"] for d in reloaded.get_active_deployments()] == []
+
+
+def test_replay_skips_entries_already_in_snapshot(base_dir):
+    tracker = DeploymentTracker(base_dir)
+    _add(tracker, "dep-1")
+    stale = tracker.journal_file.read_text()
+    tracker.save_inventory()
+    _add(tracker, "dep-2")
+
+    # A journal entry the snapshot already covers must not be applied twice
+    tracker.journal_file.write_text(stale + tracker.journal_file.read_text())
+    reloaded = DeploymentTracker(base_dir)
+
+    assert [d["id"] for d in reloaded.list_all_deployments()] == ["dep-1", "dep-2"]
+
+
+def test_replay_stops_at_truncated_last_line(base_dir):
+    tracker = DeploymentTracker(base_dir)
+    _add(tracker, "dep-1")
+    with open(tracker.journal_file, "a") as f:
+        f.write('{"op": "add", "seq": 2, "deploy')
+
+    reloaded = DeploymentTracker(base_dir)
+
+    assert [d["id"] for d in reloaded.list_all_deployments()] == ["dep-1"]
+
+
+@pytest.mark.parametrize("tail", ['{"op": "add", "seq": 2, "deploy', '{"op": "add", "seq": 2}'])
+def test_changes_after_torn_line_survive_reload(base_dir, tail):
+    tracker = DeploymentTracker(base_dir)
+    _add(tracker, "dep-1")
+    with open(tracker.journal_file, "a") as f:
+        f.write(tail)
+
+    reloaded = DeploymentTracker(base_dir)
+    _add(reloaded, "dep-2")
+    _add(reloaded, "dep-3")
+
+    assert [d["id"] for d in DeploymentTracker(base_dir).list_all_deployments()] == [
+        "dep-1", "dep-2", "dep-3"
+    ]
+
+
+def test_journal_compacts_into_snapshot(base_dir, monkeypatch):
+    monkeypatch.setattr(DeploymentTracker, "JOURNAL_COMPACT_AT", 3)
+    tracker = DeploymentTracker(base_dir)
+
+    _add(tracker, "dep-1")
+    _add(tracker, "dep-2")
+    assert len(_journal_lines(tracker)) == 2
+
+    _add(tracker, "dep-3")
+    assert _journal_lines(tracker) == []
+    snapshot = json.loads(tracker.inventory_file.read_text())
+    assert snapshot["metadata"]["journal_seq"] == 3
+    assert len(snapshot["deployments"]["aws"]["us-east-1"]) == 3
+
+    _add(tracker, "dep-4")
+    assert len(_journal_lines(tracker)) == 1
+    reloaded = DeploymentTracker(base_dir)
+    assert [d["id"] for d in reloaded.list_all_deployments()] == [
+        "dep-1", "dep-2", "dep-3", "dep-4"
+    ]
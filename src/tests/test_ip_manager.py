@@ -0,0 +1,107 @@
+"""Tests for the IP registry journal"""
+
+import json
+
+import pytest
+
+from lib.ip_manager import IPManager
+
+
+def _journal_lines(manager: IPManager):
+    return manager.journal_file.read_text().splitlines()
+
+
+def _without_timestamps(registry: dict) -> dict:
+    registry = dict(registry)
+    registry.pop("last_updated", None)
+    return registry
+
+
+def test_replay_restores_journaled_changes(base_dir):
+    manager = IPManager(base_dir)
+    manager.register_deployment_ip("dep-1", "aws", "us-east-1", "1.2.3.4")
+    manager.register_deployment_ip("dep-2", "aws", "us-east-1", "5.6.7.8")
+    manager.release_deployment_ip("dep-1")
+    subnet = manager.generate_client_subnet("dep-2")
+
+    reloaded = IPManager(base_dir)
+
+    assert _without_timestamps(reloaded.registry) == _without_timestamps(manager.registry)
+    assert reloaded.get_deployment_info("dep-1")["status"] == "released"
+    assert reloaded.check_ip_conflicts("aws", "us-east-1") == ["5.6.7.8"]
+    assert reloaded.registry["client_subnets"] == {"dep-2": subnet}
+    assert reloaded.get_ip_usage_report() == manager.get_ip_usage_report()
+
+
+def test_batch_journals_every_change(base_dir):
+    manager = IPManager(base_dir)
+    with manager.batch():
+        for i in range(5):
+            manager.register_deployment_ip(f"dep-{i}", "hetzner", "fsn1", f"10.0.0.{i}")
+
+    assert len(_journal_lines(manager)) == 5
+    assert len(IPManager(base_dir).check_ip_conflicts("hetzner", "fsn1")) == 5
+
+
+def test_replay_skips_entries_already_in_snapshot(base_dir):
+    manager = IPManager(base_dir)
+    manager.register_deployment_ip("dep-1", "aws", "us-east-1", "1.2.3.4")
+    stale = manager.journal_file.read_text()
+    manager.save_ip_registry()
+    manager.release_deployment_ip("dep-1")
+
+    # Re-applying the registration would make the released IP active again
+    manager.journal_file.write_text(stale + manager.journal_file.read_text())
+    reloaded = IPManager(base_dir)
+
+    assert reloaded.get_deployment_info("dep-1")["status"] == "released"
+    assert reloaded.check_ip_conflicts("aws", "us-east-1") == []
+
+
+def test_replay_stops_at_truncated_last_line(base_dir):
+    manager = IPManager(base_dir)
+    manager.register_deployment_ip("dep-1", "aws", "us-east-1", "1.2.3.4")
+    with open(manager.journal_file, "a") as f:
+        f.write('{"op": "register", "seq": 2, "ke')
+
+    reloaded = IPManager(base_dir)
+
+    assert reloaded.check_ip_conflicts("aws", "us-east-1") == ["1.2.3.4"]
+    assert reloaded.registry["journal_seq"] == 1
+
+
+@pytest.mark.parametrize("tail", ['{"op": "register", "seq": 2, "ke', '{"op": "subnet", "seq": 2}'])
+def test_changes_after_torn_line_survive_reload(base_dir, tail):
+    manager = IPManager(base_dir)
+    manager.register_deployment_ip("dep-1", "aws", "us-east-1", "1.2.3.4")
+    with open(manager.journal_file, "a") as f:
+        f.write(tail)
+
+    reloaded = IPManager(base_dir)
+    reloaded.register_deployment_ip("dep-2", "aws", "us-east-1", "5.6.7.8")
+    reloaded.release_deployment_ip("dep-1")
+
+    final = IPManager(base_dir)
+    assert final.check_ip_conflicts("aws", "us-east-1") == ["5.6.7.8"]
+    assert final.get_deployment_info("dep-1")["status"] == "released"
+
+
+def test_journal_compacts_into_snapshot(base_dir, monkeypatch):
+    monkeypatch.setattr(IPManager, "JOURNAL_COMPACT_AT", 3)
+    manager = IPManager(base_dir)
+
+    manager.register_deployment_ip("dep-1", "aws", "us-east-1", "1.2.3.4")
+    manager.register_deployment_ip("dep-2", "aws", "us-east-1", "5.6.7.8")
+    assert len(_journal_lines(manager)) == 2
+
+    manager.release_deployment_ip("dep-1")
+    assert _journal_lines(manager) == []
+    snapshot = json.loads(manager.ip_registry.read_text())
+    assert snapshot["journal_seq"] == 3
+    assert snapshot["elastic_ips"]["aws-us-east-1-dep-1"]["status"] == "released"
+
+    manager.generate_client_subnet("dep-2")
+    assert len(_journal_lines(manager)) == 1
+    reloaded = IPManager(base_dir)
+    assert reloaded.check_ip_conflicts("aws", "us-east-1") == ["5.6.7.8"]
+    assert "dep-2" in reloaded.registry["client_subnets"]